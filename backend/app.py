@@ -1,13 +1,31 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-from simulator import simulation, monte_carlo_retirement, find_optimal_retirement_year
+from simulator import (
+    simulation, monte_carlo_retirement, monte_carlo_adaptive, iter_monte_carlo, variance_reduction,
+    find_optimal_retirement_year, SAMPLING_METHODS,
+    simulation_batch, monte_carlo_batch, sensitivity_grid, SimulationResult, MONTE_CARLO_KEYS,
+    SWEEP_METRICS
+)
 import os
+import itertools
 from dotenv import load_dotenv
 # import firebase_admin
 # from firebase_admin import credentials, firestore
 # from datetime import datetime, timedelta
-from report_generator import generate_retirement_report
+from cache import create_cache, cache_key, source_version, ResultCache
+from storage import Store
+from jobs import JobQueue, JobLimitError, FINISHED_STATUSES, SUCCEEDED
+from metrics import metrics
+from profiling import ProfileStore, profile_call, PROFILE_MODES
+from columnar import encode_columns, COLUMNAR_MIMETYPE, PRECISIONS
+from werkzeug.http import parse_options_header
+import functools
+import hmac
 import io
+import json
+import sys
+import time
+import zipfile
 from datetime import datetime
 
 # Load environment variables
@@ -16,7 +34,23 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app, origins=["https://retirement-sim-frontend.onrender.com", "http://localhost:3000"], 
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     allow_headers=["Content-Type", "Authorization"])
+     allow_headers=["Content-Type", "Authorization", "X-Profile", "X-Admin-Token"],
+     expose_headers=["X-Profile-Id"])
+
+# Latency of every request, and of the phases timed with metrics.phase()
+# inside it, is recorded per endpoint and exposed on /metrics
+@app.before_request
+def start_request_timer():
+    metrics.start_request(request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+
+@app.after_request
+def record_response_status(response):
+    metrics.set_status(response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_timer(exc):
+    metrics.finish_request()
 
 # Initialize Firebase (temporarily disabled for testing)
 # try:
@@ -33,10 +67,72 @@ PATREON_CLIENT_SECRET = os.getenv('PATREON_CLIENT_SECRET')
 PATREON_REDIRECT_URI = os.getenv('PATREON_REDIRECT_URI', 'https://retirement-sim-frontend.onrender.com/patreon-callback.html')
 PATREON_CAMPAIGN_ID = os.getenv('PATREON_CAMPAIGN_ID')
 
-# User credit/subscription management (simplified for Patreon)
-user_credits_storage = {}
-client_storage = {}
-simulation_storage = {}
+# Monte Carlo runs at or above this many paths are sharded across the process pool
+MC_PARALLEL_THRESHOLD = int(os.getenv('MC_PARALLEL_THRESHOLD', 20000))
+MC_POOL_WORKERS = int(os.getenv('MC_POOL_WORKERS') or os.cpu_count() or 1)
+
+# Largest number of parameter sets accepted by /api/simulate/batch, and the
+# most Monte Carlo scenario-paths (scenarios x simulations) one batch or sweep
+# may run for its single credit
+BATCH_MAX_SCENARIOS = int(os.getenv('BATCH_MAX_SCENARIOS', 1000))
+BATCH_MAX_TOTAL_PATHS = int(os.getenv('BATCH_MAX_TOTAL_PATHS', 1000000))
+
+# Cache of simulation results and rendered reports, keyed on a hash of their
+# inputs. Set CACHE_BACKEND=sqlite to share it between gunicorn workers; the
+# shared cache is versioned by the backend's sources, so a deploy that
+# changes the code starts from an empty cache.
+result_cache = create_cache(version=source_version(os.path.dirname(os.path.abspath(__file__))))
+
+# Users, credits, clients and saved simulations persist in SQLite, shared by all workers
+store = Store(os.getenv('DATABASE_PATH', 'retirement_sim.sqlite3'))
+
+# Background jobs: worker threads per gunicorn worker and active jobs allowed per user.
+# A running job whose process stops renewing its lease for JOB_LEASE_SECONDS is requeued.
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+MAX_JOBS_PER_USER = int(os.getenv('MAX_JOBS_PER_USER', 2))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 60))
+# Finished jobs, PDF and Monte Carlo results included, are deleted after JOB_RETENTION_HOURS
+JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', 24))
+
+# A job's event stream closes after JOB_EVENTS_MAX_SECONDS; the client reconnects
+# after JOB_EVENTS_RETRY_MS and picks up from the Last-Event-ID it received
+JOB_EVENTS_MAX_SECONDS = float(os.getenv('JOB_EVENTS_MAX_SECONDS', 30))
+JOB_EVENTS_RETRY_MS = int(os.getenv('JOB_EVENTS_RETRY_MS', 1000))
+
+# Most paths a single Monte Carlo request may run. Adaptive runs stop at
+# MC_MAX_SIMULATIONS at the latest, or once every year's standard error is
+# below the requested tolerance (MC_ADAPTIVE_TOLERANCE by default).
+MC_MAX_SIMULATIONS = int(os.getenv('MC_MAX_SIMULATIONS', 200000))
+MC_ADAPTIVE_TOLERANCE = float(os.getenv('MC_ADAPTIVE_TOLERANCE', 0.005))
+
+# Paths run between progress updates of a streamed or queued Monte Carlo run
+MC_PROGRESS_PATHS = int(os.getenv('MC_PROGRESS_PATHS', 10000))
+
+# The report stack (report_generator with matplotlib and reportlab) loads on
+# the first report request, keeping worker boot fast. PRELOAD_REPORTS=true
+# loads it at startup instead, for a worker that mostly serves reports or
+# gunicorn --preload, where forked workers share the loaded modules.
+PRELOAD_REPORTS = os.getenv('PRELOAD_REPORTS', 'false').lower() in ('1', 'true', 'yes')
+
+def report_stack():
+    """The report_generator module, imported on first use"""
+    with metrics.phase('report_import'):
+        import report_generator
+    return report_generator
+
+if PRELOAD_REPORTS:
+    report_stack()
+
+# Admin endpoints and request profiling require ADMIN_TOKEN in the X-Admin-Token header.
+# Profiles of requests sent with X-Profile: cprofile|sample are kept in
+# PROFILE_DIR, PROFILE_KEEP at most; sampling records a stack every PROFILE_SAMPLE_INTERVAL seconds
+# An empty token or the env.example placeholder disables admin access.
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+ADMIN_TOKEN_PLACEHOLDER = 'change_me'
+if ADMIN_TOKEN == ADMIN_TOKEN_PLACEHOLDER:
+    print("ADMIN_TOKEN is still the placeholder from env.example; admin endpoints are disabled")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))
+profiles = ProfileStore(os.getenv('PROFILE_DIR', 'profiles'), keep=int(os.getenv('PROFILE_KEEP', 100)))
 
 # Discount codes storage
 discount_codes = {
@@ -63,46 +159,65 @@ discount_codes = {
     }
 }
 
+def is_admin():
+    """Whether the request carries the admin token"""
+    token = request.headers.get('X-Admin-Token')
+    if not ADMIN_TOKEN or ADMIN_TOKEN == ADMIN_TOKEN_PLACEHOLDER or token is None:
+        return False
+    return hmac.compare_digest(token, ADMIN_TOKEN)
+
+def profiled(view):
+    """Run a view under the profiler an admin names in the X-Profile header.
+
+    Profiled requests skip the result cache so the profile shows the real
+    work, store their artifact in `profiles` and return its ID in the
+    X-Profile-Id header. A streamed response is profiled until it starts.
+    Requests without the header run the view directly.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = request.headers.get('X-Profile')
+        if not mode:
+            return view(*args, **kwargs)
+        if not is_admin():
+            return jsonify({'error': 'Profiling requires a valid X-Admin-Token'}), 403
+        if mode not in PROFILE_MODES:
+            return jsonify({'error': f"X-Profile must be one of {', '.join(PROFILE_MODES)}"}), 400
+        
+        g.profiling = True
+        start = time.perf_counter()
+        result, artifact = profile_call(mode, lambda: app.make_response(view(*args, **kwargs)),
+                                        name=f'{request.method} {request.path}', interval=PROFILE_SAMPLE_INTERVAL)
+        record = profiles.save(mode, artifact, endpoint=request.url_rule.rule, path=request.path,
+                               method=request.method, status=result.status_code,
+                               duration=time.perf_counter() - start)
+        print(f"Profiled {request.method} {request.path} with {mode} as {record['id']}")
+        result.headers['X-Profile-Id'] = record['id']
+        return result
+    return wrapper
+
 def get_user_credits(user_id):
     """Get user's current credits and subscription status"""
-    if user_id not in user_credits_storage:
-        # Initialize new user with 5 credits for testing
-        user_credits_storage[user_id] = {
-            'credits': 5,  # Start with 5 credits
-            'subscription_status': 'none',
-            'unlimited': False,
-            'patreon_member': False,
-            'patreon_tier': None
-        }
-    return user_credits_storage[user_id]
+    # Initialize new user with 5 credits for testing
+    return store.get_user(user_id, initial_credits=5)
 
 def update_user_credits(user_id, credits_to_add=0, subscription_status='none', unlimited=False, patreon_member=False, patreon_tier=None):
     """Update user's credits and subscription status"""
-    if user_id not in user_credits_storage:
-        user_credits_storage[user_id] = {
-            'credits': 0,
-            'subscription_status': 'none',
-            'unlimited': False,
-            'patreon_member': False,
-            'patreon_tier': None
-        }
-    
     if credits_to_add > 0:
-        user_credits_storage[user_id]['credits'] += credits_to_add
-        print(f"Added {credits_to_add} credits to user {user_id}. New total: {user_credits_storage[user_id]['credits']}")
+        total = store.add_credits(user_id, credits_to_add)
+        print(f"Added {credits_to_add} credits to user {user_id}. New total: {total}")
     
     if subscription_status != 'none':
-        user_credits_storage[user_id]['subscription_status'] = subscription_status
-        user_credits_storage[user_id]['unlimited'] = unlimited
+        store.set_subscription(user_id, subscription_status, unlimited)
         print(f"Updated user {user_id} subscription status to {subscription_status}")
     
     if patreon_member is not None:
-        user_credits_storage[user_id]['patreon_member'] = patreon_member
-        user_credits_storage[user_id]['patreon_tier'] = patreon_tier
+        store.set_patreon_status(user_id, patreon_member, patreon_tier)
         print(f"Updated user {user_id} Patreon status: member={patreon_member}, tier={patreon_tier}")
     
     return True
 
+@metrics.timed('credit_check')
 def can_user_run_simulation(user_id):
     """Check if user can run a simulation"""
     user_data = get_user_credits(user_id)
@@ -141,32 +256,27 @@ def redeem_discount_code(user_id, code):
     
     discount = result
     
-    # Check if user has already used this code
-    user_data = get_user_credits(user_id)
-    used_codes = user_data.get('used_discount_codes', [])
-    if code in used_codes:
+    # Mark code as used by this user; fails if they already redeemed it
+    get_user_credits(user_id)
+    if not store.record_discount_redemption(user_id, code):
         return False, "You have already used this discount code"
     
     # Add credits
     credits_to_add = discount['credits']
     update_user_credits(user_id, credits_to_add=credits_to_add)
     
-    # Mark code as used by this user
-    if 'used_discount_codes' not in user_data:
-        user_credits_storage[user_id]['used_discount_codes'] = []
-    user_credits_storage[user_id]['used_discount_codes'].append(code)
-    
     # Increment usage count
     discount_codes[code]['used_count'] += 1
     
     return True, f"Successfully redeemed {credits_to_add} credits! {discount['description']}"
 
+@metrics.timed('credit_check')
 def deduct_user_credit(user_id):
     """Deduct one credit from user"""
-    if user_id not in user_credits_storage:
+    if not store.user_exists(user_id):
         return False
     
-    user_data = user_credits_storage[user_id]
+    user_data = store.get_user(user_id)
     
     # Patreon members don't use credits
     if user_data['patreon_member']:
@@ -178,99 +288,87 @@ def deduct_user_credit(user_id):
         print(f"User {user_id} has unlimited/subscription - no credit deduction")
         return True
     
-    if user_data['credits'] > 0:
-        user_credits_storage[user_id]['credits'] -= 1
-        print(f"Deducted credit from user {user_id}. Remaining credits: {user_credits_storage[user_id]['credits']}")
+    remaining = store.deduct_credit(user_id)
+    if remaining is not None:
+        print(f"Deducted credit from user {user_id}. Remaining credits: {remaining}")
         return True
     
     print(f"User {user_id} has no credits remaining")
     return False
 
+@metrics.timed('credit_check')
+def reserve_job_credit(user_id):
+    """Take the credit a queued job costs when it is submitted.
+
+    Returns None if the user has no credits left, otherwise whether a credit
+    was actually taken: members and subscribers run jobs for free.
+    """
+    user_data = get_user_credits(user_id)
+    if user_data['patreon_member'] or user_data['unlimited'] or user_data['subscription_status'] == 'active':
+        return False
+    remaining = store.deduct_credit(user_id)
+    if remaining is None:
+        print(f"User {user_id} has no credits remaining")
+        return None
+    print(f"Reserved credit for a job of user {user_id}. Remaining credits: {remaining}")
+    return True
+
+def refund_job_credit(user_id, params):
+    """Give back the credit reserved for a job that failed or was cancelled"""
+    if params.get('credit_reserved'):
+        total = store.add_credits(user_id, 1)
+        print(f"Refunded job credit to user {user_id}. New total: {total}")
+
 # Client management functions
 def get_user_clients(user_id):
     """Get all clients for a user"""
-    if user_id not in client_storage:
-        client_storage[user_id] = []
-    return client_storage[user_id]
+    return store.list_clients(user_id)
+
+def get_client(user_id, client_id):
+    """Get a single client for a user, or None if it does not exist"""
+    return store.get_client(user_id, client_id)
 
 def create_client(user_id, client_data):
     """Create a new client for a user"""
-    if user_id not in client_storage:
-        client_storage[user_id] = []
-    
-    client_id = f"client_{len(client_storage[user_id]) + 1}_{user_id}"
-    client = {
-        'id': client_id,
-        'name': client_data['name'],
-        'age': client_data['age'],
-        'date_created': client_data.get('date_created', datetime.now().strftime('%Y-%m-%d')),
-        'user_id': user_id,
-        'created_at': datetime.now().isoformat()
-    }
-    
-    client_storage[user_id].append(client)
-    return client
+    return store.create_client(
+        user_id,
+        name=client_data['name'],
+        age=client_data['age'],
+        date_created=client_data.get('date_created', datetime.now().strftime('%Y-%m-%d'))
+    )
 
 def update_client(user_id, client_id, client_data):
     """Update an existing client"""
-    if user_id not in client_storage:
+    client = store.get_client(user_id, client_id)
+    if not client:
         return None
     
-    for client in client_storage[user_id]:
-        if client['id'] == client_id:
-            client.update({
-                'name': client_data['name'],
-                'age': client_data['age'],
-                'date_created': client_data.get('date_created', client.get('date_created', ''))
-            })
-            return client
-    return None
+    return store.update_client(
+        user_id, client_id,
+        name=client_data['name'],
+        age=client_data['age'],
+        date_created=client_data.get('date_created', client.get('date_created', ''))
+    )
 
 def delete_client(user_id, client_id):
     """Delete a client and all associated simulations"""
-    if user_id not in client_storage:
-        return False
-    
-    # Remove client
-    client_storage[user_id] = [c for c in client_storage[user_id] if c['id'] != client_id]
-    
-    # Remove associated simulations
-    if user_id in simulation_storage:
-        simulation_storage[user_id] = [s for s in simulation_storage[user_id] if s['client_id'] != client_id]
-    
-    return True
+    return store.delete_client(user_id, client_id)
 
 def get_client_simulations(user_id, client_id):
     """Get all simulations for a specific client"""
-    if user_id not in simulation_storage:
-        simulation_storage[user_id] = []
-    
-    return [s for s in simulation_storage[user_id] if s['client_id'] == client_id]
+    return store.list_simulations(user_id, client_id)
 
 def can_client_have_more_simulations(user_id, client_id):
     """Check if client can have more simulations (max 5)"""
-    simulations = get_client_simulations(user_id, client_id)
-    return len(simulations) < 5
+    return store.count_simulations(user_id, client_id) < 5
 
 def save_simulation(user_id, client_id, simulation_data, simulation_type='basic'):
     """Save a simulation for a client"""
-    if user_id not in simulation_storage:
-        simulation_storage[user_id] = []
-    
-    simulation_id = f"sim_{len(simulation_storage[user_id]) + 1}_{user_id}"
-    simulation = {
-        'id': simulation_id,
-        'client_id': client_id,
-        'user_id': user_id,
-        'type': simulation_type,
-        'data': simulation_data,
-        'created_at': datetime.now().isoformat(),
-        'parameters': simulation_data.get('parameters', {}),
-        'results': simulation_data.get('results', {})
-    }
-    
-    simulation_storage[user_id].append(simulation)
-    return simulation
+    return store.save_simulation(user_id, client_id, simulation_type, simulation_data)
+
+def delete_simulation(user_id, simulation_id):
+    """Delete a saved simulation"""
+    return store.delete_simulation(user_id, simulation_id)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -282,64 +380,420 @@ def root():
     """Root endpoint"""
     return jsonify({'message': 'Retirement Simulator API', 'status': 'running'})
 
+def simulation_params(data):
+    """Normalize a /api/simulate request body into simulation() arguments"""
+    return {
+        'balance': float(data['balance']),
+        'apy': float(data['apy']),
+        'draw': float(data['draw']),
+        'duration': int(data['duration']),
+        'curr_exp': float(data['curr_exp']),
+        'tax_rate': float(data['tax_rate']),
+        'inflation': float(data['inflation']),
+        'annual_contrib': float(data.get('annual_contrib', 0)),
+        'annual_contrib_years': int(data.get('annual_contrib_years', 0)),
+        'drawdown_start': int(data.get('drawdown_start', 0))
+    }
+
+def monte_carlo_params(data):
+    """Normalize a /api/monte-carlo request body into monte_carlo_retirement() arguments"""
+    seed = data.get('seed')
+    simulations = int(data.get('simulations', 1000))
+    if simulations < 1:
+        raise ValueError('simulations must be at least 1')
+    return {
+        'balance': float(data['balance']),
+        'draw': float(data['draw']),
+        'duration': int(data['duration']),
+        'curr_exp': float(data['curr_exp']),
+        'tax_rate': float(data['tax_rate']),
+        'apy_mean': float(data['apy_mean']),
+        'apy_sd': float(data['apy_sd']),
+        'inflation_mean': float(data['inflation_mean']),
+        'inflation_sd': float(data['inflation_sd']),
+        'annual_contrib': float(data.get('annual_contrib', 0)),
+        'annual_contrib_years': int(data.get('annual_contrib_years', 0)),
+        'drawdown_start': int(data.get('drawdown_start', 0)),
+        'simulations': simulations,
+        'annual_returns': bool(data.get('annual_returns', False)),
+        'seed': None if seed is None else int(seed),
+        'sampling': data.get('sampling', 'random')
+    }
+
+def with_derived_seed(params, adaptive=None):
+    """params with a seed derived from the other parameters if the request gave none.
+
+    Repeating an unseeded request then gives the same answer, so it can be
+    served from the result cache like a seeded one.
+    """
+    if params['seed'] is not None:
+        return params
+    digest = cache_key('monte-carlo-seed', dict(params, **(adaptive or {}))).split(':')[1]
+    return dict(params, seed=int(digest[:16], 16))
+
+def adaptive_settings(data):
+    """Stopping rule of an adaptive Monte Carlo request, or None for a fixed path count"""
+    if not data.get('adaptive'):
+        return None
+    return {
+        'tolerance': float(data.get('tolerance', MC_ADAPTIVE_TOLERANCE)),
+        'min_simulations': int(data.get('min_simulations', 2000))
+    }
+
+def columnar_precision():
+    """Float precision of the columnar format if the Accept header prefers it, else None.
+
+    Clients opt in with `Accept: application/vnd.retirement-sim.columnar+json`,
+    optionally with `; precision=float32`; anything else gets the legacy JSON.
+    """
+    precision, columnar_q, json_q = None, 0, 0
+    for value, quality in request.accept_mimetypes:
+        mimetype, options = parse_options_header(value)
+        if mimetype == COLUMNAR_MIMETYPE and quality > columnar_q:
+            precision, columnar_q = options.get('precision', 'float64'), quality
+        elif mimetype == 'application/json':
+            json_q = max(json_q, quality)
+    return precision if columnar_q and columnar_q >= json_q else None
+
+def negotiated_response(body, columns, precision):
+    """The legacy JSON body, or the columnar encoding of columns when precision is set"""
+    with metrics.phase('serialize'):
+        if precision:
+            response = Response(encode_columns(columns, precision), mimetype=COLUMNAR_MIMETYPE)
+        else:
+            response = jsonify(body() if callable(body) else body)
+    response.vary.add('Accept')
+    return response
+
+def precision_not_acceptable():
+    return jsonify({'error': f"Columnar precision must be one of {', '.join(PRECISIONS)}"}), 406
+
 @app.route('/api/simulate', methods=['POST'])
 def api_simulate():
     data = request.json
     user_id = data.get('user_id')  # Frontend will send this
+    precision = columnar_precision()
+    if precision not in (None, *PRECISIONS):
+        return precision_not_acceptable()
     
     # Check if user can run simulation
     if user_id and not can_user_run_simulation(user_id):
         return jsonify({'error': 'No credits remaining. Please purchase more credits or subscribe.'}), 402
     
-    result = simulation(
-        balance=data['balance'],
-        apy=data['apy'],
-        draw=data['draw'],
-        duration=data['duration'],
-        curr_exp=data['curr_exp'],
-        tax_rate=data['tax_rate'],
-        inflation=data['inflation'],
-        annual_contrib=data.get('annual_contrib', 0),
-        annual_contrib_years=data.get('annual_contrib_years', 0),
-        drawdown_start=data.get('drawdown_start', 0)
-    )
+    params = simulation_params(data)
+    key = cache_key('simulate', params)
+    result = result_cache.get(key)
+    if result is None:
+        with metrics.phase('simulation'):
+            result = simulation(**params)
+        result_cache.set(key, result)
     
     # Deduct credit if user is logged in
     if user_id:
         deduct_user_credit(user_id)
     
-    return jsonify(result)
+    return negotiated_response(result.to_dict, dict(years=len(result), **result.columns()), precision)
 
 @app.route('/api/monte-carlo', methods=['POST'])
+@profiled
 def api_monte_carlo():
     data = request.json
     user_id = data.get('user_id')
+    precision = columnar_precision()
+    if precision not in (None, *PRECISIONS):
+        return precision_not_acceptable()
     
     # Check if user can run simulation
     if user_id and not can_user_run_simulation(user_id):
         return jsonify({'error': 'No credits remaining. Please purchase more credits or subscribe.'}), 402
     
-    result = monte_carlo_retirement(
-        balance=data['balance'],
-        draw=data['draw'],
-        duration=data['duration'],
-        curr_exp=data['curr_exp'],
-        tax_rate=data['tax_rate'],
-        apy_mean=data['apy_mean'],
-        apy_sd=data['apy_sd'],
-        inflation_mean=data['inflation_mean'],
-        inflation_sd=data['inflation_sd'],
-        annual_contrib=data.get('annual_contrib', 0),
-        annual_contrib_years=data.get('annual_contrib_years', 0),
-        drawdown_start=data.get('drawdown_start', 0),
-        simulations=data.get('simulations', 1000)
-    )
+    try:
+        params = monte_carlo_params(data)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid Monte Carlo parameters: {e}'}), 400
+    if params['sampling'] not in SAMPLING_METHODS:
+        return jsonify({'error': f"sampling must be one of {', '.join(SAMPLING_METHODS)}"}), 400
+    adaptive = adaptive_settings(data)
+    if adaptive:
+        # simulations is the path cap of an adaptive run
+        params['simulations'] = min(int(data.get('simulations', MC_MAX_SIMULATIONS)), MC_MAX_SIMULATIONS)
+    elif params['simulations'] > MC_MAX_SIMULATIONS:
+        return jsonify({'error': f'simulations may be at most {MC_MAX_SIMULATIONS}; use adaptive mode to stop early once the estimate is precise enough.'}), 400
+    
+    # Cached entries hold (success_rates, paths used, standard_errors)
+    params = with_derived_seed(params, adaptive)
+    key = cache_key('monte-carlo', dict(params, **adaptive) if adaptive else params)
+    workers = MC_POOL_WORKERS if params['simulations'] >= MC_PARALLEL_THRESHOLD else None
+    # Plain fixed-count runs keep the original response; the others report their precision
+    detailed = bool(adaptive) or params['sampling'] != 'random'
+    
+    if data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+        # Deduct up front: the client may stop reading once the estimate is good enough
+        if user_id:
+            deduct_user_credit(user_id)
+        batch_paths = int(data.get('batch_paths', MC_PROGRESS_PATHS))
+        return Response(stream_with_context(monte_carlo_events(params, key, workers, batch_paths, adaptive)),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    result = result_cache.get(key) if not g.get('profiling') else None
+    if result is None:
+        with metrics.phase('simulation'):
+            if adaptive:
+                run = {name: value for name, value in params.items() if name != 'simulations'}
+                result = monte_carlo_adaptive(**run, **adaptive, max_simulations=params['simulations'], workers=workers)
+            else:
+                success_rates, standard_errors = monte_carlo_retirement(
+                    **params, workers=workers, return_standard_errors=True)
+                result = (success_rates, params['simulations'], standard_errors)
+        result_cache.set(key, result)
+    
+    # Deduct credit if user is logged in
+    if user_id:
+        deduct_user_credit(user_id)
+    
+    columns = monte_carlo_columns(*result, detailed=detailed)
+    return negotiated_response(lambda: array_lists(columns), columns, precision)
+
+def monte_carlo_columns(success_rates, paths, standard_errors, detailed=True):
+    """Fields of a Monte Carlo result; detailed adds its precision and the paths used"""
+    columns = {'success_rates': success_rates}
+    if detailed:
+        columns['standard_errors'] = standard_errors
+        columns['simulations_used'] = paths
+        columns['variance_reduction'] = variance_reduction(success_rates, paths, standard_errors)
+    return columns
+
+def monte_carlo_body(success_rates, paths, standard_errors, detailed=True):
+    """JSON body for a Monte Carlo result"""
+    return array_lists(monte_carlo_columns(success_rates, paths, standard_errors, detailed))
+
+def array_lists(value):
+    """value with every NumPy array in it, including those inside dicts and lists, turned into lists"""
+    if isinstance(value, dict):
+        return {name: array_lists(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [array_lists(item) for item in value]
+    return value.tolist() if hasattr(value, 'tolist') else value
+
+def monte_carlo_events(params, key, workers, batch_paths, adaptive=None):
+    """Server-sent events for a streamed Monte Carlo run.
+
+    A `progress` event follows each batch of paths with the running success
+    rates and their standard errors; the last batch is sent as a `result`
+    event instead and cached like a regular run. Adaptive runs end as soon
+    as their tolerance is met. Closing the connection stops the run after
+    the current batch.
+    """
+    simulations = params['simulations']
+    result = result_cache.get(key)
+    if result is not None:
+        yield monte_carlo_event('result', simulations, *result)
+        return
+    for result in iter_monte_carlo(**params, workers=workers, batch_paths=batch_paths):
+        paths, success_rates, standard_errors = result
+        if adaptive and paths >= adaptive['min_simulations'] and standard_errors.max() < adaptive['tolerance']:
+            break
+        if paths < simulations:
+            yield monte_carlo_event('progress', simulations, success_rates, paths, standard_errors)
+    result = (success_rates, paths, standard_errors)
+    result_cache.set(key, result)
+    yield monte_carlo_event('result', simulations, *result)
+
+def monte_carlo_event(event, simulations, success_rates, paths, standard_errors):
+    payload = dict(monte_carlo_body(success_rates, paths, standard_errors), paths=paths, simulations=simulations)
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def expand_batch_scenarios(data):
+    """Expand a batch request into one parameter dict per scenario.
+
+    Each entry of `scenarios` (or a single empty one) is crossed with every
+    point of the `grid` axes, and each combination is layered over `base`.
+    """
+    base = data.get('base', {})
+    overrides = data.get('scenarios') or [{}]
+    grid = data.get('grid') or {}
+    axes = list(grid)
+    points = [dict(zip(axes, values)) for values in itertools.product(*(grid[axis] for axis in axes))]
+    return [{**base, **override, **point} for override in overrides for point in points]
+
+@app.route('/api/simulate/batch', methods=['POST'])
+def api_simulate_batch():
+    """Evaluate many simulation or Monte Carlo parameter sets in one request"""
+    data = request.json
+    user_id = data.get('user_id')
+    precision = columnar_precision()
+    if precision not in (None, *PRECISIONS):
+        return precision_not_acceptable()
+    
+    # One credit check and deduction covers the whole batch
+    if user_id and not can_user_run_simulation(user_id):
+        return jsonify({'error': 'No credits remaining. Please purchase more credits or subscribe.'}), 402
+    
+    kind = data.get('kind', 'simulate')
+    scenarios = expand_batch_scenarios(data)
+    if len(scenarios) > BATCH_MAX_SCENARIOS:
+        return jsonify({'error': f'Batch exceeds the maximum of {BATCH_MAX_SCENARIOS} scenarios'}), 400
+    
+    try:
+        if kind == 'simulate':
+            params = [simulation_params(scenario) for scenario in scenarios]
+            with metrics.phase('simulation'):
+                results = simulation_batch(params)
+            response = {
+                'kind': kind,
+                'scenarios': params,
+                'results': {
+                    field: [getattr(result, attr) for result in results]
+                    for attr, field in SimulationResult.FIELDS
+                }
+            }
+        elif kind == 'monte_carlo':
+            params = [
+                {key: value for key, value in monte_carlo_params(scenario).items()
+                 if key in MONTE_CARLO_KEYS or key == 'duration'}
+                for scenario in scenarios
+            ]
+            # Path count, seed and return model apply to the whole batch
+            seed = data.get('seed')
+            simulations = int(data.get('simulations', 1000))
+            if not 1 <= simulations <= MC_MAX_SIMULATIONS:
+                return jsonify({'error': f'simulations must be between 1 and {MC_MAX_SIMULATIONS}'}), 400
+            if len(params) * simulations > BATCH_MAX_TOTAL_PATHS:
+                return jsonify({'error': f'Batch exceeds the maximum of {BATCH_MAX_TOTAL_PATHS} scenario-paths '
+                                         f'(scenarios x simulations); split it into smaller batches'}), 400
+            with metrics.phase('simulation'):
+                success_rates = monte_carlo_batch(
+                    params,
+                    simulations=simulations,
+                    annual_returns=bool(data.get('annual_returns', False)),
+                    seed=None if seed is None else int(seed)
+                )
+            response = {
+                'kind': kind,
+                'scenarios': params,
+                'success_rates': list(success_rates)
+            }
+        else:
+            return jsonify({'error': f'Unknown batch kind: {kind}'}), 400
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid scenario parameters: {e}'}), 400
     
     # Deduct credit if user is logged in
     if user_id:
         deduct_user_credit(user_id)
     
-    return jsonify({'success_rates': result.tolist()})
+    return negotiated_response(lambda: array_lists(response), response, precision)
+
+@app.route('/api/sweep', methods=['POST'])
+def api_sweep():
+    """Success rate or median final balance over a grid of two Monte Carlo parameters"""
+    data = request.json
+    user_id = data.get('user_id')
+    
+    # Check if user can run simulation
+    if user_id and not can_user_run_simulation(user_id):
+        return jsonify({'error': 'No credits remaining. Please purchase more credits or subscribe.'}), 402
+    
+    x_axis = data.get('x_axis') or {}
+    y_axis = data.get('y_axis') or {}
+    metric = data.get('metric', 'success_rate')
+    axis_names = MONTE_CARLO_KEYS + ('duration',)
+    if x_axis.get('name') not in axis_names or y_axis.get('name') not in axis_names or x_axis['name'] == y_axis['name']:
+        return jsonify({'error': f'x_axis and y_axis must name two different parameters from: {", ".join(axis_names)}'}), 400
+    if not x_axis.get('values') or not y_axis.get('values'):
+        return jsonify({'error': 'Both axes need at least one value'}), 400
+    if len(x_axis['values']) * len(y_axis['values']) > BATCH_MAX_SCENARIOS:
+        return jsonify({'error': f'Sweep exceeds the maximum of {BATCH_MAX_SCENARIOS} grid cells'}), 400
+    if metric not in SWEEP_METRICS:
+        return jsonify({'error': f'Unknown sweep metric: {metric}'}), 400
+    
+    try:
+        # Normalize the axis values the same way as the base parameters
+        first_cell = dict(data.get('base', {}), **{x_axis['name']: x_axis['values'][0], y_axis['name']: y_axis['values'][0]})
+        params = monte_carlo_params(first_cell)
+        if params['simulations'] > MC_MAX_SIMULATIONS:
+            return jsonify({'error': f'simulations may be at most {MC_MAX_SIMULATIONS}'}), 400
+        if len(x_axis['values']) * len(y_axis['values']) * params['simulations'] > BATCH_MAX_TOTAL_PATHS:
+            return jsonify({'error': f'Sweep exceeds the maximum of {BATCH_MAX_TOTAL_PATHS} scenario-paths '
+                                     f'(grid cells x simulations); use fewer cells or paths'}), 400
+        x_values = [type(params[x_axis['name']])(value) for value in x_axis['values']]
+        y_values = [type(params[y_axis['name']])(value) for value in y_axis['values']]
+        year = data.get('year')
+        with metrics.phase('simulation'):
+            grid = sensitivity_grid(
+                {key: params[key] for key in axis_names},
+                x_axis['name'], x_values, y_axis['name'], y_values,
+                metric=metric,
+                year=None if year is None else int(year),
+                simulations=params['simulations'],
+                annual_returns=params['annual_returns'],
+                seed=params['seed']
+            )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid sweep parameters: {e}'}), 400
+    
+    # Deduct credit if user is logged in
+    if user_id:
+        deduct_user_credit(user_id)
+    
+    with metrics.phase('serialize'):
+        return jsonify({
+            'metric': metric,
+            'year': year,
+            'parameters': params,
+            'x_axis': {'name': x_axis['name'], 'values': x_values},
+            'y_axis': {'name': y_axis['name'], 'values': y_values},
+            'values': grid.tolist()
+        })
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters and occupancy of the simulation result cache"""
+    return jsonify(result_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request latency and phase histograms, cache hit rates and job queue depth for Prometheus"""
+    caches = [('result', result_cache.stats())]
+    # Chart cache counters only exist once the report stack has loaded
+    if 'report_generator' in sys.modules:
+        caches.append(('chart', sys.modules['report_generator'].chart_cache.stats()))
+    extra = [
+        ('cache_hits_total', 'counter', 'Cache lookups that found an entry',
+         [({'cache': name}, stats['hits']) for name, stats in caches]),
+        ('cache_misses_total', 'counter', 'Cache lookups that found no entry',
+         [({'cache': name}, stats['misses']) for name, stats in caches]),
+        ('cache_hit_rate', 'gauge', 'Share of cache lookups that were hits',
+         [({'cache': name}, stats['hit_rate']) for name, stats in caches]),
+        ('cache_entries', 'gauge', 'Entries currently held by the cache',
+         [({'cache': name}, stats['size']) for name, stats in caches]),
+        ('job_queue_depth', 'gauge', 'Background jobs by status',
+         [({'status': status}, count) for status, count in jobs.depth().items()]),
+    ]
+    return Response(metrics.render(extra), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Stored request profiles, newest first (admin only)"""
+    if not is_admin():
+        return jsonify({'error': 'Admin token required'}), 403
+    return jsonify(profiles.list())
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Download a stored profile: pstats for cprofile, speedscope JSON for sample (admin only)"""
+    if not is_admin():
+        return jsonify({'error': 'Admin token required'}), 403
+    record = profiles.get(profile_id)
+    if not record or not os.path.exists(profiles.path(record)):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(
+        os.path.abspath(profiles.path(record)),
+        mimetype='application/json' if record['format'] == 'speedscope' else 'application/octet-stream',
+        as_attachment=True,
+        download_name=record['filename']
+    )
 
 @app.route('/api/user-credits', methods=['GET'])
 def get_credits():
@@ -608,24 +1062,64 @@ def delete_simulation_endpoint(client_id, simulation_id):
         return jsonify({'error': 'User ID required'}), 400
     
     # Check if client exists
-    clients = get_user_clients(user_id)
-    client = next((c for c in clients if c['id'] == client_id), None)
+    client = get_client(user_id, client_id)
     if not client:
         return jsonify({'error': 'Client not found'}), 404
     
     # Check if simulation exists and belongs to this client
-    simulations = get_client_simulations(user_id, client_id)
-    simulation = next((s for s in simulations if s['id'] == simulation_id), None)
-    if not simulation:
+    simulation = store.get_simulation(user_id, simulation_id)
+    if not simulation or simulation['client_id'] != client_id:
         return jsonify({'error': 'Simulation not found'}), 404
     
     # Delete the simulation
-    if user_id in simulation_storage:
-        simulation_storage[user_id] = [s for s in simulation_storage[user_id] if s['id'] != simulation_id]
+    delete_simulation(user_id, simulation_id)
     
     return jsonify({'message': 'Simulation deleted successfully'})
 
+def latest_simulations(all_simulations):
+    """Keep only the most recent simulation of each type that appears in the report"""
+    most_recent_simulations = []
+    for simulation_type in ('basic', 'monte_carlo', 'sweep'):
+        of_type = [s for s in all_simulations if s['type'] == simulation_type]
+        if of_type:
+            most_recent_simulations.append(max(of_type, key=lambda x: x['created_at']))
+    return most_recent_simulations
+
+def report_options(data):
+    """Detailed-table layout options of a report request; raises ValueError if invalid"""
+    options = {}
+    if data.get('table_mode') is not None:
+        table_modes = report_stack().TABLE_MODES
+        if data['table_mode'] not in table_modes:
+            raise ValueError(f"table_mode must be one of {', '.join(table_modes)}")
+        options['table_mode'] = data['table_mode']
+    if data.get('page_rows') is not None:
+        options['table_page_rows'] = int(data['page_rows'])
+    if data.get('bucket_years') is not None:
+        options['table_bucket_years'] = int(data['bucket_years'])
+    return options
+
+def build_report_pdf(client, simulations, options=None, use_cache=True):
+    """Render a client's report to PDF bytes, reusing a cached copy of identical input.
+
+    Without use_cache the report and its charts are rendered from scratch.
+    """
+    options = options or {}
+    key = cache_key('report', dict({'client': client, 'simulations': simulations}, **options))
+    pdf_bytes = result_cache.get(key) if use_cache else None
+    if pdf_bytes is None:
+        print(f"Generating report for client {client['id']} with {len(simulations)} most recent simulations")
+        charts = {} if use_cache else {'charts': ResultCache()}
+        pdf_bytes = report_stack().generate_retirement_report(client_data=client, simulations=simulations,
+                                                              **options, **charts).getvalue()
+        result_cache.set(key, pdf_bytes)
+    return pdf_bytes
+
+def report_filename(client):
+    return f'retirement_report_{client["name"].replace(" ", "_")}.pdf'
+
 @app.route('/api/clients/<client_id>/report', methods=['POST'])
+@profiled
 def generate_report(client_id):
     """Generate a consolidated PDF report for a client."""
     data = request.json
@@ -635,8 +1129,7 @@ def generate_report(client_id):
         return jsonify({'error': 'User ID is required'}), 400
     
     # Get client data
-    clients = get_user_clients(user_id)
-    client = next((c for c in clients if c['id'] == client_id), None)
+    client = get_client(user_id, client_id)
     if not client:
         return jsonify({'error': 'Client not found'}), 404
     
@@ -645,38 +1138,22 @@ def generate_report(client_id):
     if not all_simulations:
         return jsonify({'error': 'No simulations found for this client to generate a report.'}), 404
 
-    # Filter to only the most recent simulation of each type
-    basic_simulations = [s for s in all_simulations if s['type'] == 'basic']
-    monte_carlo_simulations = [s for s in all_simulations if s['type'] == 'monte_carlo']
-    
-    # Get the most recent of each type
-    most_recent_simulations = []
-    
-    if basic_simulations:
-        most_recent_basic = max(basic_simulations, key=lambda x: x['created_at'])
-        most_recent_simulations.append(most_recent_basic)
-    
-    if monte_carlo_simulations:
-        most_recent_mc = max(monte_carlo_simulations, key=lambda x: x['created_at'])
-        most_recent_simulations.append(most_recent_mc)
+    most_recent_simulations = latest_simulations(all_simulations)
+    try:
+        options = report_options(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
-        print(f"Generating report for client {client_id} with {len(most_recent_simulations)} most recent simulations")
-        
-        # Generate PDF report with only the most recent simulations
-        pdf_buffer = generate_retirement_report(
-            client_data=client,
-            simulations=most_recent_simulations
-        )
+        pdf_bytes = build_report_pdf(client, most_recent_simulations, options, use_cache=not g.get('profiling'))
         
         # Return the PDF file
-        pdf_buffer.seek(0)
-        filename = f'retirement_report_{client["name"].replace(" ", "_")}.pdf'
+        pdf_buffer = io.BytesIO(pdf_bytes)
         return send_file(
             pdf_buffer,
             mimetype='application/pdf',
             as_attachment=True,
-            download_name=filename
+            download_name=report_filename(client)
         )
         
     except Exception as e:
@@ -685,6 +1162,286 @@ def generate_report(client_id):
         traceback.print_exc()
         return jsonify({'error': f'Failed to generate consolidated report: {str(e)}'}), 500
 
+class ChunkWriter(io.RawIOBase):
+    """Unseekable sink that hands back whatever has been written since the last drain()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_report_zip(reports):
+    """Yield a ZIP archive of cached and freshly rendered reports as each one becomes available.
+
+    `reports` is a list of (client, simulations, cache key, cached PDF or None).
+    A report that fails to render is logged and replaced by a text entry
+    naming the error, so the rest of the archive still arrives intact.
+    """
+    sink = ChunkWriter()
+    # PDFs are already compressed, so entries are stored as is
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        pending = []
+        for client, simulations, key, pdf_bytes in reports:
+            if pdf_bytes is None:
+                pending.append((client, simulations, key))
+                continue
+            archive.writestr(f"{client['id']}_{report_filename(client)}", pdf_bytes)
+            yield sink.drain()
+        for index, pdf_bytes, error in report_stack().iter_client_reports([(client, simulations) for client, simulations, _ in pending]):
+            client, _, key = pending[index]
+            if error is not None:
+                print(f"Error generating bulk report for client {client['id']}: {error}")
+                archive.writestr(f"{client['id']}_report_error.txt",
+                                 f"The report for {client['name']} could not be generated: {error}\n")
+            else:
+                result_cache.set(key, pdf_bytes)
+                archive.writestr(f"{client['id']}_{report_filename(client)}", pdf_bytes)
+            yield sink.drain()
+    yield sink.drain()
+
+@app.route('/api/reports/bulk', methods=['POST'])
+def generate_bulk_reports():
+    """Generate reports for many of a user's clients at once.
+
+    Renders in a process pool and streams a ZIP of per-client PDFs as they
+    finish (format 'zip', the default), or returns one combined PDF
+    (format 'pdf'). Clients without saved simulations are skipped.
+    """
+    data = request.json
+    user_id = data.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+    
+    output = data.get('format', 'zip')
+    if output not in ('zip', 'pdf'):
+        return jsonify({'error': "format must be 'zip' or 'pdf'"}), 400
+    
+    clients = get_user_clients(user_id)
+    if data.get('client_ids') is not None:
+        wanted = set(data['client_ids'])
+        clients = [client for client in clients if client['id'] in wanted]
+    
+    reports = []
+    for client in clients:
+        simulations = latest_simulations(get_client_simulations(user_id, client['id']))
+        if simulations:
+            reports.append((client, simulations))
+    if not reports:
+        return jsonify({'error': 'No clients with simulations found to report on.'}), 404
+    
+    if output == 'pdf':
+        try:
+            pdf_bytes = report_stack().generate_combined_report(reports).getvalue()
+        except Exception as e:
+            print(f"Error generating combined report: {e}")
+            return jsonify({'error': f'Failed to generate combined report: {str(e)}'}), 500
+        return send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name='retirement_reports.pdf'
+        )
+    
+    print(f"Generating bulk reports for {len(reports)} clients of user {user_id}")
+    keyed = []
+    for client, simulations in reports:
+        key = cache_key('report', {'client': client, 'simulations': simulations})
+        keyed.append((client, simulations, key, result_cache.get(key)))
+    return Response(stream_with_context(stream_report_zip(keyed)), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=retirement_reports.zip'})
+
+def run_monte_carlo_job(params, context):
+    """Job handler for a Monte Carlo run, reporting progress after each batch of paths.
+
+    Its credit was taken at submit and is refunded if the job fails or is cancelled.
+    """
+    params = {key: value for key, value in params.items() if key != 'credit_reserved'}
+    key = cache_key('monte-carlo', params) if params['seed'] is not None else None
+    result = result_cache.get(key) if key else None
+    if result is None:
+        workers = MC_POOL_WORKERS if params['simulations'] >= MC_PARALLEL_THRESHOLD else None
+        for paths, success_rates, standard_errors in iter_monte_carlo(
+                **params, workers=workers, batch_paths=MC_PROGRESS_PATHS):
+            context.update(paths / params['simulations'])
+        result = (success_rates, paths, standard_errors)
+        if key:
+            result_cache.set(key, result)
+    return monte_carlo_body(*result, detailed=params['sampling'] != 'random')
+
+def run_report_job(params, context):
+    """Job handler for a client's PDF report"""
+    client = get_client(context.user_id, params['client_id'])
+    if not client:
+        raise ValueError('Client not found')
+    simulations = latest_simulations(get_client_simulations(context.user_id, params['client_id']))
+    if not simulations:
+        raise ValueError('No simulations found for this client to generate a report.')
+    context.check_cancelled()
+    return {'pdf': build_report_pdf(client, simulations), 'filename': report_filename(client)}
+
+def create_job_queue(path, workers=JOB_WORKERS, max_active_per_user=MAX_JOBS_PER_USER):
+    queue = JobQueue(path, workers=workers, max_active_per_user=max_active_per_user,
+                     lease_timeout=JOB_LEASE_SECONDS, retention=JOB_RETENTION_HOURS * 3600)
+    queue.register('monte_carlo', run_monte_carlo_job, on_abort=refund_job_credit)
+    queue.register('report', run_report_job)
+    return queue
+
+# Jobs share the SQLite file with the rest of the persistent data. Each
+# process starts its worker threads at boot: gunicorn workers in the
+# post_worker_init hook (gunicorn.conf.py), the development server below.
+jobs = create_job_queue(os.getenv('DATABASE_PATH', 'retirement_sim.sqlite3'))
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a Monte Carlo run or a client report and return its job record.
+
+    Poll GET /api/jobs/<id> (or stream /api/jobs/<id>/events) until the job
+    finishes, then fetch GET /api/jobs/<id>/result.
+    """
+    data = request.json
+    user_id = data.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    kind = data.get('kind', 'monte_carlo')
+    if kind == 'monte_carlo':
+        try:
+            params = monte_carlo_params(data)
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid Monte Carlo parameters: {e}'}), 400
+        if params['simulations'] > MC_MAX_SIMULATIONS:
+            return jsonify({'error': f'simulations may be at most {MC_MAX_SIMULATIONS}'}), 400
+        if params['sampling'] not in SAMPLING_METHODS:
+            return jsonify({'error': f"sampling must be one of {', '.join(SAMPLING_METHODS)}"}), 400
+        # The credit is taken now, so concurrent submits cannot overspend it
+        reserved = reserve_job_credit(user_id)
+        if reserved is None:
+            return jsonify({'error': 'No credits remaining. Please purchase more credits or subscribe.'}), 402
+        # Same derived seed as /api/monte-carlo, so the two share cache entries
+        params = with_derived_seed(params)
+        params['credit_reserved'] = reserved
+    elif kind == 'report':
+        client_id = data.get('client_id')
+        if not get_client(user_id, client_id):
+            return jsonify({'error': 'Client not found'}), 404
+        params = {'client_id': client_id}
+    else:
+        return jsonify({'error': f"Unknown job kind: {kind}"}), 400
+    
+    try:
+        job = jobs.submit(user_id, kind, params)
+    except JobLimitError:
+        refund_job_credit(user_id, params)
+        return jsonify({'error': f'You already have {MAX_JOBS_PER_USER} jobs running. Wait for one to finish or cancel it.'}), 429
+    return jsonify(job), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List a user's most recent jobs"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    return jsonify(jobs.list(user_id))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a job's status and progress"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    job = jobs.get(user_id, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """Stream a job's status as server-sent events until it finishes.
+
+    Each stream lasts at most JOB_EVENTS_MAX_SECONDS; reconnect with the
+    Last-Event-ID header to continue without repeating the last snapshot.
+    """
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    if not jobs.get(user_id, job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # A reconnecting EventSource sends the id of the last snapshot it saw;
+    # that snapshot is not sent again unless it is the final one
+    resumed_from = request.headers.get('Last-Event-ID')
+    
+    def events():
+        last = None
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        yield f"retry: {JOB_EVENTS_RETRY_MS}\n\n"
+        while True:
+            job = jobs.get(user_id, job_id)
+            finished = job is None or job['status'] in FINISHED_STATUSES
+            if job != last:
+                event_id = cache_key('job-event', job)[:16]
+                if finished or event_id != resumed_from:
+                    yield f"id: {event_id}\nevent: status\ndata: {json.dumps(job)}\n\n"
+                last = job
+            # The stream ends after JOB_EVENTS_MAX_SECONDS so no request holds a
+            # thread for the whole run; the client reconnects and resumes
+            if finished or time.monotonic() >= deadline:
+                return
+            time.sleep(0.5)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Fetch a finished job's result: Monte Carlo JSON or the report PDF"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    job = jobs.get(user_id, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != SUCCEEDED:
+        return jsonify({'error': f"Job is {job['status']}", 'job': job}), 409
+    
+    result = jobs.result(user_id, job_id)
+    if job['kind'] == 'report':
+        return send_file(
+            io.BytesIO(result['pdf']),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=result['filename']
+        )
+    return jsonify(result)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID required'}), 400
+    
+    job = jobs.cancel(user_id, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job)
+
 @app.route('/api/patreon/join-campaign', methods=['POST'])
 def join_patreon_campaign():
     """Redirect user to join Patreon campaign"""
@@ -790,4 +1547,5 @@ def list_discount_codes():
         return jsonify({'error': 'Failed to list discount codes'}), 500
 
 if __name__ == '__main__':
+    jobs.start()
     app.run(debug=True)
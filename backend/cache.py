@@ -0,0 +1,236 @@
+"""
+Content-addressed result cache for the simulation endpoints
+
+Two interchangeable backends share the get/set/clear/stats interface:
+ResultCache lives in process memory, SQLiteCache keeps entries in a SQLite
+file so every gunicorn worker on the host sees the same cache.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def cache_key(namespace, params):
+    """Hash a parameter set into a stable key, independent of dict ordering"""
+    payload = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+class ResultCache:
+    """In-process LRU cache with a per-entry time to live and hit/miss counters"""
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl
+            }
+
+def source_version(directory):
+    """Fingerprint of the Python sources in a directory, used as a cache version"""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+# A lookup is a single read: hit and miss counts build up in the process and
+# are added to the shared counters every STATS_FLUSH_LOOKUPS lookups or
+# STATS_FLUSH_SECONDS (and by stats()), and a hit only rewrites an entry's
+# accessed_at once it is RECENCY_RESOLUTION seconds old, so eviction is least
+# recently used to within that resolution.
+STATS_FLUSH_LOOKUPS = 100
+STATS_FLUSH_SECONDS = 10.0
+RECENCY_RESOLUTION = 60.0
+
+class SQLiteCache:
+    """LRU cache in a SQLite file, shared by every process that opens the same path.
+
+    Opening the file with a different version (e.g. source_version() after a
+    deploy) drops its entries, so values pickled by other code are not served.
+    """
+
+    def __init__(self, path, max_entries=1024, ttl=3600, version=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = version
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {'hits': 0, 'misses': 0}
+        self._flushed = time.monotonic()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany("INSERT OR IGNORE INTO cache_counters (name, value) VALUES (?, 0)",
+                             [('hits',), ('misses',)])
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if version is not None:
+            self._check_version(version)
+
+    def _check_version(self, version):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT value FROM cache_meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != version:
+                conn.execute("DELETE FROM cache_entries")
+                conn.execute("INSERT OR REPLACE INTO cache_meta (name, value) VALUES ('version', ?)", (version,))
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?",
+                           (key,)).fetchone()
+        value = None
+        if row is not None and row[1] < now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        elif row is not None:
+            try:
+                value = pickle.loads(row[0])
+            except Exception:
+                # Pickled by code that no longer matches; recompute it
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            else:
+                if now - row[2] >= RECENCY_RESOLUTION:
+                    conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def _count(self, counter):
+        with self._lock:
+            self._pending[counter] += 1
+            due = (sum(self._pending.values()) >= STATS_FLUSH_LOOKUPS or
+                   time.monotonic() - self._flushed >= STATS_FLUSH_SECONDS)
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's pending hit and miss counts to the shared counters"""
+        with self._lock:
+            pending, self._pending = self._pending, {'hits': 0, 'misses': 0}
+            self._flushed = time.monotonic()
+        updates = [(count, name) for name, count in pending.items() if count]
+        if updates:
+            self._connect().executemany("UPDATE cache_counters SET value = value + ? WHERE name = ?", updates)
+
+    def set(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, now + self.ttl, now))
+            conn.execute("""
+                DELETE FROM cache_entries WHERE key IN (
+                    SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("UPDATE cache_counters SET value = 0")
+        with self._lock:
+            self._pending = {'hits': 0, 'misses': 0}
+
+    def stats(self):
+        """Counters of every process, as of each one's last flush; this one's are flushed first"""
+        self.flush_stats()
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM cache_counters").fetchall())
+        size = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+            'size': size,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl
+        }
+
+def create_cache(backend=None, path=None, max_entries=None, ttl=None, version=None):
+    """Build the cache selected by CACHE_BACKEND ('memory' or 'sqlite').
+
+    version (or CACHE_VERSION) keys a SQLite cache; entries written under
+    another version are dropped when it opens.
+    """
+    backend = backend or os.getenv('CACHE_BACKEND', 'memory')
+    max_entries = max_entries or int(os.getenv('RESULT_CACHE_SIZE', 1024))
+    ttl = ttl or int(os.getenv('RESULT_CACHE_TTL', 3600))
+    if backend == 'sqlite':
+        path = path or os.getenv('CACHE_PATH', 'cache.sqlite3')
+        return SQLiteCache(path, max_entries=max_entries, ttl=ttl, version=os.getenv('CACHE_VERSION') or version)
+    if backend == 'memory':
+        return ResultCache(max_entries=max_entries, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
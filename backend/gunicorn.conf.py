@@ -0,0 +1,51 @@
+"""
+gunicorn settings, loaded automatically when gunicorn starts in this directory
+
+Bind address, worker count and timeout stay on the command line.
+"""
+
+import os
+import sys
+import tempfile
+
+from dotenv import load_dotenv
+
+# The settings below read .env like the app does
+load_dotenv()
+
+# Threaded workers. A server-sent event stream (/api/monte-carlo with stream,
+# /api/jobs/<id>/events) holds one thread rather than a whole worker, and the
+# worker keeps heartbeating to the master while requests run, so --timeout
+# no longer cuts off the stream of a long run.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Workers write their request metrics here and /metrics sums every worker's
+# file, so a scrape answered by any one worker covers the whole server
+os.environ['METRICS_DIR'] = os.getenv('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'retirement-sim-metrics')
+
+def on_starting(server):
+    # A new server starts its counters from zero, dropping the last run's files
+    directory = os.environ['METRICS_DIR']
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+def post_worker_init(worker):
+    # Start the worker's background job threads as soon as the app is loaded,
+    # so queued jobs and jobs left behind by a previous deploy run without
+    # waiting for a new submission. Runs after the fork, also under --preload.
+    from app import jobs
+    jobs.start()
+    # Split the CPUs between the workers' process pools rather than giving
+    # every worker cpu_count processes of its own
+    share = max(1, (os.cpu_count() or 1) // worker.cfg.workers)
+    if not os.getenv('MC_POOL_WORKERS'):
+        import simulator
+        simulator.configure_process_pool(share)
+    if not os.getenv('REPORT_POOL_WORKERS'):
+        if 'report_generator' in sys.modules:
+            sys.modules['report_generator'].configure_report_pool(share)
+        else:
+            # Read when the report stack loads on the first report request
+            os.environ['REPORT_POOL_WORKERS'] = str(share)
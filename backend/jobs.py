@@ -0,0 +1,387 @@
+"""
+Durable background job queue for long Monte Carlo runs and PDF reports
+
+Jobs live in a SQLite table, so any gunicorn worker can answer status
+requests and queued jobs survive a restart. Each process runs a small pool
+of worker threads that claim queued jobs from the table, run the handler
+registered for the job's kind and store its result.
+
+A running job holds a lease that its process renews while it is alive. Once
+the lease runs out, whichever process notices first takes the job back, so
+jobs left behind by a crashed or redeployed host go back on the queue.
+Finished jobs, results included, are deleted once they are older than the
+queue's retention period.
+"""
+
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result BLOB,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, status);
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Columns added after the first release, for tables created without them
+_ADDED_COLUMNS = (('lease_expires', 'REAL'), ('attempts', 'INTEGER NOT NULL DEFAULT 0'))
+
+class JobLimitError(Exception):
+    """Raised when a user already has the maximum number of active jobs"""
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested"""
+
+class JobContext:
+    """Handed to a job handler to report progress and notice cancellation"""
+
+    def __init__(self, queue, job_id, user_id):
+        self._queue = queue
+        self.job_id = job_id
+        self.user_id = user_id
+
+    def update(self, progress):
+        """Record progress in [0, 1] and renew the lease; raises JobCancelled if the job was cancelled"""
+        conn = self._queue._connect()
+        conn.execute("UPDATE jobs SET progress = ?, lease_expires = ? WHERE id = ? AND owner = ?",
+                     (float(progress), self._queue._lease_deadline(), self.job_id, self._queue._owner()))
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        row = self._queue._connect().execute(
+            "SELECT status, owner, cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        # A job taken back after its lease ran out is no longer this worker's to finish
+        if row is None or row['cancel_requested'] or row['status'] != RUNNING or row['owner'] != self._queue._owner():
+            raise JobCancelled(self.job_id)
+
+class JobQueue:
+    """SQLite-backed job table with a per-process pool of worker threads.
+
+    Running jobs hold a lease of lease_timeout seconds, renewed every quarter
+    of that. A job whose lease expires is queued again, or failed once it
+    has been started max_attempts times. Jobs that finished more than
+    retention seconds ago are deleted on the same schedule.
+    """
+
+    def __init__(self, path, workers=2, max_active_per_user=2, poll_interval=1.0,
+                 lease_timeout=60.0, max_attempts=3, retention=86400.0):
+        self.path = path
+        self.workers = workers
+        self.max_active_per_user = max_active_per_user
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._handlers = {}
+        self._abort_hooks = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            _add_missing_columns(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def register(self, kind, handler, on_abort=None):
+        """Run handler(params, context) for jobs of this kind; its return value is the job result.
+
+        on_abort(user_id, params), if given, is called once for every job of
+        this kind that ends failed or cancelled, in whichever process ends it.
+        """
+        self._handlers[kind] = handler
+        if on_abort:
+            self._abort_hooks[kind] = on_abort
+
+    # Submitting and inspecting jobs
+
+    def submit(self, user_id, kind, params):
+        """Queue a job and return its record; raises JobLimitError if the user is at their limit"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        # Jobs whose worker is gone must not count against the limit
+        self._recover_expired()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            active = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)",
+                (user_id, *ACTIVE_STATUSES)).fetchone()[0]
+            if active >= self.max_active_per_user:
+                raise JobLimitError(f"User {user_id} already has {active} active jobs")
+            cursor = conn.execute(
+                "INSERT INTO jobs (id, user_id, kind, status, params, created_at) VALUES ('', ?, ?, ?, ?, ?)",
+                (user_id, kind, QUEUED, json.dumps(params), datetime.now().isoformat()))
+            job_id = f"job_{cursor.lastrowid}_{user_id}"
+            conn.execute("UPDATE jobs SET id = ? WHERE seq = ?", (job_id, cursor.lastrowid))
+        self.start()
+        self._wakeup.set()
+        return self.get(user_id, job_id)
+
+    def get(self, user_id, job_id):
+        row = self._connect().execute(
+            "SELECT * FROM jobs WHERE id = ? AND user_id = ?", (job_id, user_id)).fetchone()
+        return self._job_dict(row) if row else None
+
+    def list(self, user_id, limit=50):
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE user_id = ? ORDER BY seq DESC LIMIT ?", (user_id, limit))
+        return [self._job_dict(row) for row in rows]
+
+    def result(self, user_id, job_id):
+        """Return the stored result of a succeeded job, or None"""
+        row = self._connect().execute(
+            "SELECT result FROM jobs WHERE id = ? AND user_id = ? AND status = ?",
+            (job_id, user_id, SUCCEEDED)).fetchone()
+        return pickle.loads(row['result']) if row and row['result'] is not None else None
+
+    def cancel(self, user_id, job_id):
+        """Cancel a job: queued jobs stop at once, running jobs at their next progress update.
+
+        A running job whose worker is gone (its lease has expired, or its process
+        on this host has exited) is cancelled at once.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND user_id = ? AND status IN (?, ?)",
+                (job_id, user_id, *ACTIVE_STATUSES))
+            queued = conn.execute("SELECT kind, params FROM jobs WHERE id = ? AND user_id = ? AND status = ?",
+                                  (job_id, user_id, QUEUED)).fetchone()
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND user_id = ? AND status = ?",
+                (CANCELLED, datetime.now().isoformat(), job_id, user_id, QUEUED))
+        if queued:
+            self._aborted(queued['kind'], user_id, json.loads(queued['params']))
+        self._recover_expired()
+        return self.get(user_id, job_id)
+
+    def depth(self):
+        """Number of queued and running jobs across all processes"""
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE status IN (?, ?) GROUP BY status", ACTIVE_STATUSES)
+        counts = dict.fromkeys(ACTIVE_STATUSES, 0)
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+    @staticmethod
+    def _job_dict(row):
+        return {
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'cancel_requested': bool(row['cancel_requested']),
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+
+    # Worker threads
+
+    def start(self):
+        """Start this process's worker threads, if not already running"""
+        with self._start_lock:
+            if self._started_pid == os.getpid() or self.workers <= 0:
+                return
+            self._stopping.clear()
+            self._recover_expired()
+            self._threads = [threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                             for i in range(self.workers)]
+            self._threads.append(threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True))
+            for thread in self._threads:
+                thread.start()
+            self._started_pid = os.getpid()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._started_pid = None
+
+    def _owner(self):
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _lease_deadline(self):
+        return time.time() + self.lease_timeout
+
+    def _heartbeat(self):
+        # Renew the leases of this process's running jobs, take back jobs
+        # whose leases ran out wherever they were running, and drop old
+        # finished jobs
+        while not self._stopping.wait(self.lease_timeout / 4):
+            try:
+                self._connect().execute("UPDATE jobs SET lease_expires = ? WHERE status = ? AND owner = ?",
+                                        (self._lease_deadline(), RUNNING, self._owner()))
+                self._recover_expired()
+                self._purge_finished()
+            except sqlite3.Error as e:
+                print(f"Job heartbeat failed: {e}")
+
+    def _purge_finished(self):
+        """Delete jobs, and their stored results, that finished over retention seconds ago"""
+        cutoff = (datetime.now() - timedelta(seconds=self.retention)).isoformat()
+        deleted = self._connect().execute(
+            f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?",
+            (*FINISHED_STATUSES, cutoff)).rowcount
+        if deleted:
+            print(f"Deleted {deleted} jobs finished before {cutoff}")
+
+    def _recover_expired(self):
+        """Take back running jobs whose worker is gone.
+
+        That is any job whose lease has expired, from any host, and at once any
+        job owned by a process on this host that has exited. Cancelled jobs end
+        as cancelled; jobs already started max_attempts times fail; the rest
+        are queued again.
+        """
+        conn = self._connect()
+        host = socket.gethostname()
+        ended = []
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, user_id, kind, params, owner, lease_expires, cancel_requested, attempts "
+                "FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            now = time.time()
+            for row in rows:
+                owner_host, _, pid = (row['owner'] or '').rpartition(':')
+                exited = owner_host == host and pid.isdigit() and not _pid_alive(int(pid))
+                if not exited and row['lease_expires'] is not None and row['lease_expires'] >= now:
+                    continue
+                if row['cancel_requested']:
+                    status, error = CANCELLED, None
+                elif row['attempts'] >= self.max_attempts:
+                    status, error = FAILED, f"Worker lost {row['attempts']} times while running the job"
+                else:
+                    conn.execute("UPDATE jobs SET status = ?, owner = NULL, progress = 0, lease_expires = NULL, "
+                                 "started_at = NULL WHERE id = ?", (QUEUED, row['id']))
+                    print(f"Job {row['id']} requeued: worker {row['owner']} is gone")
+                    continue
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires = NULL "
+                             "WHERE id = ?", (status, error, datetime.now().isoformat(), row['id']))
+                print(f"Job {row['id']} {status}: worker {row['owner']} is gone")
+                ended.append(row)
+        for row in ended:
+            self._aborted(row['kind'], row['user_id'], json.loads(row['params']))
+
+    def _aborted(self, kind, user_id, params):
+        hook = self._abort_hooks.get(kind)
+        if hook is None:
+            return
+        try:
+            hook(user_id, params)
+        except Exception as e:
+            print(f"Abort hook for a {kind} job of user {user_id} failed: {e}")
+
+    def _claim(self):
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT id, user_id, kind, params FROM jobs WHERE status = ? AND kind IN ({','.join('?' * len(kinds))}) "
+                "ORDER BY seq LIMIT 1", (QUEUED, *kinds)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, owner = ?, started_at = ?, lease_expires = ?, "
+                         "attempts = attempts + 1 WHERE id = ?",
+                         (RUNNING, self._owner(), datetime.now().isoformat(), self._lease_deadline(), row['id']))
+        return row['id'], row['user_id'], row['kind'], json.loads(row['params'])
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(*job)
+
+    def _run(self, job_id, user_id, kind, params):
+        context = JobContext(self, job_id, user_id)
+        status, result, error = SUCCEEDED, None, None
+        try:
+            context.check_cancelled()
+            result = self._handlers[kind](params, context)
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            status, error = FAILED, str(e)
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL) if status == SUCCEEDED else None
+        # Only the current owner may finish the job; another process may have
+        # taken it back while this one was stalled past its lease
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires = NULL, "
+            "progress = CASE WHEN ? THEN 1.0 ELSE progress END WHERE id = ? AND status = ? AND owner = ?",
+            (status, blob, error, datetime.now().isoformat(), status == SUCCEEDED, job_id, RUNNING, self._owner()))
+        if cursor.rowcount == 0:
+            print(f"Job {job_id} was taken back from this worker; its outcome is dropped")
+        elif status != SUCCEEDED:
+            self._aborted(kind, user_id, params)
+
+def _add_missing_columns(conn):
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for name, definition in _ADDED_COLUMNS:
+        if name not in columns:
+            try:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+            except sqlite3.OperationalError as e:
+                # Another process added it first
+                if 'duplicate column' not in str(e):
+                    raise
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,238 @@
+"""
+Request latency and phase timing metrics in the Prometheus text format
+
+The Flask app opens a request timer for every request; code on the request's
+thread times its phases (credit check, simulation kernel, serialization,
+chart rendering, PDF layout) with metrics.phase(name). When the request ends
+its total latency and each phase's total go into histograms labelled by
+endpoint. Metrics are kept per process; with METRICS_DIR set (gunicorn.conf.py
+sets it for every worker) each process also writes its totals to a file in
+that directory, at most FLUSH_INTERVAL seconds behind, and render() sums the
+files of every process, so a scrape of any worker reports the whole server.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Longest a process's file in METRICS_DIR lags behind its in-memory totals
+FLUSH_INTERVAL = 1.0
+
+# The timer of the request being handled on this thread, if any. Threads
+# started by the request (chart or process pools) do not inherit it, so work
+# they do is only counted through the phase that waits for it.
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+class RequestTimer:
+    """Start time and accumulated phase durations of one request"""
+
+    def __init__(self, endpoint, method):
+        self.endpoint = endpoint
+        self.method = method
+        self.status = 500
+        self.start = time.perf_counter()
+        self.phases = {}
+        self._open = set()
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """Copy of every series, {labels: [bucket counts, sum, count]}"""
+        with self._lock:
+            return {labels: [list(counts), total, count] for labels, (counts, total, count) in self._series.items()}
+
+    def lines(self, series=None):
+        """Exposition lines of this histogram's series, or of the given (merged) snapshot"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        series = self.snapshot() if series is None else series
+        for labels, (counts, total, count) in sorted(series.items()):
+            label_text = _labels(self.label_names, labels)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+class Metrics:
+    """Request and phase histograms plus a request counter by status"""
+
+    def __init__(self, directory=None):
+        self.requests = Histogram('http_request_duration_seconds', 'Request latency by endpoint',
+                                  ('endpoint', 'method'))
+        self.phases = Histogram('http_request_phase_seconds', 'Time spent in each phase of a request',
+                                ('endpoint', 'phase'))
+        self._responses = {}
+        self._lock = threading.Lock()
+        # Shared directory of per-process totals, and the process whose flush is scheduled
+        self.directory = directory
+        self._flush_pid = None
+
+    def start_request(self, endpoint, method):
+        timer = RequestTimer(endpoint, method)
+        _current.set(timer)
+        return timer
+
+    def finish_request(self):
+        """Record the current request's latency and phases; no-op outside a request"""
+        timer = _current.get()
+        if timer is None:
+            return
+        _current.set(None)
+        self.requests.observe((timer.endpoint, timer.method), time.perf_counter() - timer.start)
+        for phase, seconds in timer.phases.items():
+            self.phases.observe((timer.endpoint, phase), seconds)
+        key = (timer.endpoint, timer.method, str(timer.status))
+        with self._lock:
+            self._responses[key] = self._responses.get(key, 0) + 1
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        # One pending flush per process; the pid check drops a schedule
+        # inherited across a fork, whose timer thread did not survive it
+        if self.directory is None:
+            return
+        with self._lock:
+            if self._flush_pid == os.getpid():
+                return
+            self._flush_pid = os.getpid()
+        timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+        timer.daemon = True
+        timer.start()
+
+    def flush(self):
+        """Write this process's totals to its file in the metrics directory"""
+        if self.directory is None:
+            return
+        with self._lock:
+            self._flush_pid = None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(_encode(self._snapshot()), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _snapshot(self):
+        with self._lock:
+            responses = dict(self._responses)
+        return {'requests': self.requests.snapshot(), 'phases': self.phases.snapshot(), 'responses': responses}
+
+    def _server_snapshot(self):
+        """This process's totals plus the last flushed totals of every other process"""
+        snapshots = [self._snapshot()]
+        own = f"{os.getpid()}.json"
+        for name in sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else ():
+            if name.endswith('.json') and name != own:
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        snapshots.append(_decode(json.load(f)))
+                except (OSError, ValueError):
+                    continue
+        return _merge(snapshots)
+
+    @staticmethod
+    def set_status(status):
+        timer = _current.get()
+        if timer is not None:
+            timer.status = status
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the block to the current request's phase total.
+
+        Outside a request, or nested inside the same phase, the block runs untimed.
+        """
+        timer = _current.get()
+        if timer is None or name in timer._open:
+            yield
+            return
+        timer._open.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer.phases[name] = timer.phases.get(name, 0.0) + time.perf_counter() - start
+            timer._open.discard(name)
+
+    def timed(self, name):
+        """Decorator timing every call of a function as the given phase"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self, extra=()):
+        """Prometheus text exposition of every metric, followed by the extra metric families"""
+        snapshot = self._snapshot() if self.directory is None else self._server_snapshot()
+        lines = self.requests.lines(snapshot['requests']) + self.phases.lines(snapshot['phases'])
+        lines += metric_lines('http_requests_total', 'counter', 'Requests by endpoint and status',
+                              [(dict(zip(('endpoint', 'method', 'status'), key)), count)
+                               for key, count in sorted(snapshot['responses'].items())])
+        for family in extra:
+            lines += metric_lines(*family)
+        return '\n'.join(lines) + '\n'
+
+def _encode(snapshot):
+    # JSON has no tuple keys; series become [labels, value] pairs
+    return {name: [[list(labels), value] for labels, value in series.items()] for name, series in snapshot.items()}
+
+def _decode(snapshot):
+    return {name: {tuple(labels): value for labels, value in series} for name, series in snapshot.items()}
+
+def _merge(snapshots):
+    """Sum per-process snapshots into one"""
+    merged = {'requests': {}, 'phases': {}, 'responses': {}}
+    for snapshot in snapshots:
+        for name in ('requests', 'phases'):
+            for labels, (counts, total, count) in snapshot[name].items():
+                series = merged[name].setdefault(labels, [[0] * len(counts), 0.0, 0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+        for key, count in snapshot['responses'].items():
+            merged['responses'][key] = merged['responses'].get(key, 0) + count
+    return merged
+
+def metric_lines(name, kind, help_text, samples):
+    """Exposition lines of a counter or gauge family; samples are (labels dict, value) pairs"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = _labels(labels.keys(), labels.values())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+metrics = Metrics(os.getenv('METRICS_DIR') or None)
@@ -0,0 +1,167 @@
+"""
+Opt-in profiling of single requests
+
+profile_call() runs a function under cProfile (a pstats file, for snakeviz
+or `python -m pstats`) or under a sampling profiler that records the
+calling thread's stack at a fixed interval (a speedscope JSON file, for
+https://www.speedscope.app). ProfileStore keeps the artifacts in a
+directory with a small JSON description of each, pruning the oldest.
+"""
+
+import cProfile
+import json
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+PROFILE_MODES = ('cprofile', 'sample')
+FORMATS = {'cprofile': ('pstats', '.prof'), 'sample': ('speedscope', '.speedscope.json')}
+_PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{6}_[0-9a-f]{8}$')
+# Only one deterministic profiler can be active in a process at a time
+_cprofile_lock = threading.Lock()
+
+class SamplingProfiler:
+    """Records one thread's call stack every interval seconds from a background thread"""
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.frames = []
+        self.samples = []
+        self.weights = []
+        self._frame_index = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = self._last = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples.append(self._stack(frame))
+                self.weights.append(now - self._last)
+            self._last = now
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+            stack.append(index)
+            frame = frame.f_back
+        # speedscope lists each stack from the outermost frame
+        return stack[::-1]
+
+    def speedscope(self, name):
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'retirement-simulator',
+            'activeProfileIndex': 0,
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self._elapsed,
+                'samples': self.samples,
+                'weights': self.weights
+            }]
+        }
+
+def profile_call(mode, func, name='request', interval=0.005):
+    """Run func() under the profiler for mode; returns (result, artifact bytes)"""
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        with _cprofile_lock:
+            try:
+                result = profiler.runcall(func)
+            finally:
+                profiler.create_stats()
+        # The same bytes Profile.dump_stats() writes, read by pstats.Stats
+        return result, marshal.dumps(profiler.stats)
+    if mode == 'sample':
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        try:
+            result = func()
+        finally:
+            profiler.stop()
+        return result, json.dumps(profiler.speedscope(name)).encode('utf-8')
+    raise ValueError(f"Unknown profile mode: {mode}")
+
+class ProfileStore:
+    """Profile artifacts and their descriptions in a directory, keeping the newest keep of them"""
+
+    def __init__(self, directory, keep=100):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def save(self, mode, artifact, **details):
+        """Store an artifact made in mode; returns its description, including the new profile ID"""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_format, extension = FORMATS[mode]
+        profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        record = dict(details, id=profile_id, mode=mode, format=profile_format,
+                      filename=profile_id + extension, size=len(artifact),
+                      created_at=datetime.now().isoformat())
+        with open(os.path.join(self.directory, record['filename']), 'wb') as f:
+            f.write(artifact)
+        with open(os.path.join(self.directory, profile_id + '.json'), 'w') as f:
+            json.dump(record, f)
+        self._prune()
+        return record
+
+    def list(self):
+        """Descriptions of the stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        records = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json') and _PROFILE_ID.match(name[:-len('.json')]):
+                record = self.get(name[:-len('.json')])
+                if record:
+                    records.append(record)
+        return sorted(records, key=lambda record: record['created_at'], reverse=True)
+
+    def get(self, profile_id):
+        if not _PROFILE_ID.match(profile_id or ''):
+            return None
+        try:
+            with open(os.path.join(self.directory, profile_id + '.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def path(self, record):
+        return os.path.join(self.directory, record['filename'])
+
+    def _prune(self):
+        with self._lock:
+            for record in self.list()[self.keep:]:
+                for name in (record['filename'], record['id'] + '.json'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
@@ -4,19 +4,76 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
+# Charts use explicit Figure/FigureCanvasAgg objects rather than pyplot's
+# global state, so several can be drawn at once from different threads
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import io
+import os
 import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
 import numpy as np
 import matplotlib.ticker as mticker
+from simulator import as_simulation_result, process_pool_context
+from cache import ResultCache
+from metrics import metrics
+
+# Charts are rasterized at REPORT_CHART_DPI (300, print quality; set 150 for
+# smaller, faster on-screen reports) and cached by a hash of their data, so
+# re-rendering an unchanged chart skips matplotlib.
+REPORT_CHART_DPI = int(os.getenv('REPORT_CHART_DPI', 300))
+# Threads drawing a report's charts concurrently before it is laid out; 1 draws inline
+REPORT_CHART_WORKERS = int(os.getenv('REPORT_CHART_WORKERS', min(4, os.cpu_count() or 1)))
+# Detailed results table: 'full' is one table with a row per year, 'paged'
+# splits it into fixed-size tables of REPORT_TABLE_PAGE_ROWS rows, and
+# 'bucketed' summarizes it into bands of REPORT_TABLE_BUCKET_YEARS years
+TABLE_MODES = ('full', 'paged', 'bucketed')
+REPORT_TABLE_MODE = os.getenv('REPORT_TABLE_MODE', 'full')
+REPORT_TABLE_PAGE_ROWS = int(os.getenv('REPORT_TABLE_PAGE_ROWS', 40))
+REPORT_TABLE_BUCKET_YEARS = int(os.getenv('REPORT_TABLE_BUCKET_YEARS', 5))
+chart_cache = ResultCache(max_entries=int(os.getenv('REPORT_CHART_CACHE_SIZE', 256)),
+                          ttl=int(os.getenv('REPORT_CHART_CACHE_TTL', 3600)))
+
+def chart_key(kind, *parts):
+    """Hash a chart's kind and input series into a cache key"""
+    digest = hashlib.sha256(kind.encode('utf-8'))
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(f"{part.dtype}{part.shape}".encode('utf-8'))
+            digest.update(part.tobytes())
+        else:
+            digest.update(repr(part).encode('utf-8'))
+    return f"chart:{digest.hexdigest()}"
+
+class _ChartCollector(dict):
+    """Chart cache stand-in that keeps every chart set on it"""
+
+    def set(self, key, value):
+        self[key] = value
+
+def new_figure(figsize):
+    """A standalone figure on its own Agg canvas, independent of pyplot"""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
 
 class RetirementReportGenerator:
-    def __init__(self):
+    def __init__(self, chart_dpi=None, charts=None, chart_workers=None,
+                 table_mode=None, table_page_rows=None, table_bucket_years=None):
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
+        self.chart_dpi = chart_dpi or REPORT_CHART_DPI
+        self.charts = chart_cache if charts is None else charts
+        self.chart_workers = chart_workers or REPORT_CHART_WORKERS
+        self.table_mode = table_mode or REPORT_TABLE_MODE
+        if self.table_mode not in TABLE_MODES:
+            raise ValueError(f"Unknown table mode: {self.table_mode}")
+        self.table_page_rows = max(1, int(table_page_rows or REPORT_TABLE_PAGE_ROWS))
+        self.table_bucket_years = max(1, int(table_bucket_years or REPORT_TABLE_BUCKET_YEARS))
     
     def setup_custom_styles(self):
         """Setup custom paragraph styles for the report"""
@@ -59,6 +116,18 @@ class RetirementReportGenerator:
             leading=14
         )
         
+        # Detailed results table style, shared by every table in the report
+        self.detailed_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1976d2')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+        ])
+        
         # Highlight style
         self.highlight_style = ParagraphStyle(
             'CustomHighlight',
@@ -77,28 +146,25 @@ class RetirementReportGenerator:
         2. Annual income growth over years (with y-axis labeled at major millions)
         Returns (principal_chart_buffer, income_chart_buffer)
         """
-        # DEBUG: Print the keys and a sample value
-        print(f"[DEBUG] create_retirement_chart called for {client_name}")
-        print(f"[DEBUG] results keys: {list(results.keys())}")
-        if results:
-            first_key = next(iter(results.keys()))
-            print(f"[DEBUG] sample value for {first_key}: {results[first_key]}")
-        # Extract years, principal, and income in correct order
-        sorted_years = sorted(results.keys(), key=lambda x: int(x.split('-')[1]))
-        years = []
-        principals = []
-        incomes = []
-        for year_key in sorted_years:
-            data = results[year_key]
-            if 'principal' in data and data['principal'] is not None:
-                year_num = int(year_key.split('-')[1])
-                years.append(year_num)
-                principals.append(data['principal'])
-                incomes.append(data.get('income', 0))
-        if not years:
+        result = as_simulation_result(results)
+        # Years with a recorded principal, already in year order
+        has_principal = ~np.isnan(result.principal)
+        years = result.years[has_principal]
+        principals = result.principal[has_principal]
+        incomes = np.nan_to_num(result.income[has_principal])
+        if not len(years):
             return None, None
-        # --- Principal Chart ---
-        fig1, ax1 = plt.subplots(figsize=(8, 4.5))
+        principal_buffer = self._cached_chart(
+            chart_key('principal', self.chart_dpi, years, principals, client_name),
+            lambda: self._draw_principal_chart(years, principals, client_name))
+        income_buffer = self._cached_chart(
+            chart_key('income', self.chart_dpi, years, incomes),
+            lambda: self._draw_income_chart(years, incomes))
+        return principal_buffer, income_buffer
+    
+    def _draw_principal_chart(self, years, principals, client_name):
+        fig1 = new_figure(figsize=(8, 4.5))
+        ax1 = fig1.add_subplot()
         ax1.plot(years, principals, color='#1976d2', linewidth=2, label='Portfolio Balance')
         ax1.fill_between(years, principals, alpha=0.3, color='#1976d2')
         ax1.set_xlabel('Year')
@@ -113,12 +179,11 @@ class RetirementReportGenerator:
         if max_principal >= 1e6:
             ax1.set_yticks([i*1e6 for i in range(1, int(max_principal//1e6)+2)])
         fig1.tight_layout()
-        principal_buffer = io.BytesIO()
-        fig1.savefig(principal_buffer, format='png', dpi=300, bbox_inches='tight')
-        principal_buffer.seek(0)
-        plt.close(fig1)
-        # --- Income Chart ---
-        fig2, ax2 = plt.subplots(figsize=(8, 4.5))
+        return fig1
+    
+    def _draw_income_chart(self, years, incomes):
+        fig2 = new_figure(figsize=(8, 4.5))
+        ax2 = fig2.add_subplot()
         ax2.plot(years, incomes, color='#388e3c', linewidth=2, label='Annual Income')
         ax2.fill_between(years, incomes, alpha=0.3, color='#388e3c')
         ax2.set_xlabel('Year')
@@ -132,39 +197,87 @@ class RetirementReportGenerator:
         if max_income >= 1e6:
             ax2.set_yticks([i*1e6 for i in range(1, int(max_income//1e6)+2)])
         fig2.tight_layout()
-        income_buffer = io.BytesIO()
-        fig2.savefig(income_buffer, format='png', dpi=300, bbox_inches='tight')
-        income_buffer.seek(0)
-        plt.close(fig2)
-        return principal_buffer, income_buffer
+        return fig2
+    
+    def _cached_chart(self, key, draw):
+        """PNG buffer for a chart, drawing it with draw() only on a cache miss"""
+        png = self.charts.get(key)
+        if png is None:
+            with metrics.phase('chart_render'):
+                png = self._render_png(draw())
+            self.charts.set(key, png)
+        return io.BytesIO(png)
+    
+    def _render_png(self, fig):
+        # The layout is already tight, so skip bbox_inches='tight' and its
+        # extra draw pass. reportlab re-compresses the pixels when embedding,
+        # so fast PNG compression loses nothing.
+        img_buffer = io.BytesIO()
+        fig.savefig(img_buffer, format='png', dpi=self.chart_dpi, pil_kwargs={'compress_level': 1})
+        return img_buffer.getvalue()
     
     def create_monte_carlo_chart(self, success_rates, target_rate):
         """Create a Monte Carlo success rate chart"""
-        plt.figure(figsize=(10, 6))
+        return self._cached_chart(
+            chart_key('monte_carlo', self.chart_dpi, np.asarray(success_rates, dtype=float), target_rate),
+            lambda: self._draw_monte_carlo_chart(success_rates, target_rate))
+    
+    def _draw_monte_carlo_chart(self, success_rates, target_rate):
+        fig = new_figure(figsize=(10, 6))
+        ax = fig.add_subplot()
         
         years = list(range(1, len(success_rates) + 1))
         
-        plt.plot(years, [rate * 100 for rate in success_rates], 'b-', linewidth=2, label='Success Rate')
-        plt.axhline(y=target_rate * 100, color='red', linestyle='--', linewidth=2, label=f'Target Rate ({target_rate * 100}%)')
-        plt.fill_between(years, [rate * 100 for rate in success_rates], alpha=0.3, color='blue')
+        ax.plot(years, [rate * 100 for rate in success_rates], 'b-', linewidth=2, label='Success Rate')
+        ax.axhline(y=target_rate * 100, color='red', linestyle='--', linewidth=2, label=f'Target Rate ({target_rate * 100}%)')
+        ax.fill_between(years, [rate * 100 for rate in success_rates], alpha=0.3, color='blue')
         
-        plt.xlabel('Year', fontsize=12)
-        plt.ylabel('Success Rate (%)', fontsize=12)
-        plt.title('Monte Carlo Success Rate Analysis', fontsize=14, fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        plt.legend()
+        ax.set_xlabel('Year', fontsize=12)
+        ax.set_ylabel('Success Rate (%)', fontsize=12)
+        ax.set_title('Monte Carlo Success Rate Analysis', fontsize=14, fontweight='bold')
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+        fig.tight_layout()
         
-        # Save to bytes
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
+        return fig
+    
+    def create_sweep_heatmap(self, sweep):
+        """Create a heatmap of a sensitivity sweep grid"""
+        values = np.array(sweep['values'], dtype=float)
+        x_axis, y_axis = sweep['x_axis'], sweep['y_axis']
+        is_rate = sweep.get('metric', 'success_rate') == 'success_rate'
+        return self._cached_chart(
+            chart_key('sweep', self.chart_dpi, values, x_axis, y_axis, is_rate),
+            lambda: self._draw_sweep_heatmap(values, x_axis, y_axis, is_rate))
+    
+    def _draw_sweep_heatmap(self, values, x_axis, y_axis, is_rate):
         
-        return img_buffer
+        fig = new_figure(figsize=(8, 5.5))
+        ax = fig.add_subplot()
+        image = ax.imshow(values * 100 if is_rate else values, cmap='RdYlGn', aspect='auto', origin='lower')
+        ax.set_xticks(range(len(x_axis['values'])))
+        ax.set_xticklabels([f"{v:g}" for v in x_axis['values']], rotation=45 if len(x_axis['values']) > 8 else 0)
+        ax.set_yticks(range(len(y_axis['values'])))
+        ax.set_yticklabels([f"{v:g}" for v in y_axis['values']])
+        ax.set_xlabel(x_axis['name'])
+        ax.set_ylabel(y_axis['name'])
+        title = 'Success Rate (%)' if is_rate else 'Median Final Balance ($)'
+        ax.set_title(f'Sensitivity Analysis - {title}', fontsize=14, fontweight='bold')
+        fig.colorbar(image, ax=ax, label=title)
+        
+        # Label each cell when the grid is small enough to read
+        if values.size <= 100:
+            for (row, col), value in np.ndenumerate(values):
+                label = f"{value * 100:.0f}%" if is_rate else f"${value / 1e6:.1f}M"
+                ax.text(col, row, label, ha='center', va='center', fontsize=8)
+        
+        fig.tight_layout()
+        
+        return fig
     
     def format_currency(self, amount):
         """Format currency values"""
-        if amount is None:
+        if amount is None or amount != amount:
             return "N/A"
         return f"${amount:,.0f}"
     
@@ -174,11 +287,9 @@ class RetirementReportGenerator:
         
         if simulation_type == 'basic':
             # Analyze basic simulation results
-            first_year = list(results.keys())[0]
-            last_year = list(results.keys())[-1]
-            
-            initial_balance = results[first_year]['principal']
-            final_balance = results[last_year]['principal']
+            result = as_simulation_result(results)
+            initial_balance = result.principal[0]
+            final_balance = result.principal[-1]
             
             # Check if portfolio depletes
             if final_balance <= 0:
@@ -228,33 +339,32 @@ class RetirementReportGenerator:
         # ... (Add parameter and summary tables here, similar to original)
 
         # Add detailed results table if present
-        if results:
+        result = as_simulation_result(results)
+        if len(result):
             story.append(Paragraph("Detailed Results by Year", self.subsection_style))
-            sorted_years = sorted(results.keys(), key=lambda x: int(x.split('-')[1]))
-            detailed_data = [["Year", "Principal", "Income (Pre-Tax)", "Real Income (Post-Tax)", "Projected Spend", "Surplus", "Status"]]
-            for year in sorted_years:
-                data = results[year]
-                detailed_data.append([
-                    year, self.format_currency(data.get('principal')), self.format_currency(data.get('income')),
-                    self.format_currency(data.get('real_income cap')), self.format_currency(data.get('projected_spend')),
-                    self.format_currency(data.get('surplus')), str(data.get('status', ''))
-                ])
-            detailed_table = Table(detailed_data, colWidths=[0.8*inch, 1*inch, 1*inch, 1.2*inch, 1*inch, 1*inch, 1*inch])
-            detailed_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1976d2')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 8),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-            ]))
-            story.append(detailed_table)
+            if self.table_mode == 'bucketed':
+                story.append(Paragraph(
+                    f"Grouped in {self.table_bucket_years}-year bands. Principal is the balance at the end of "
+                    f"each band; income, spend and surplus are totals over the band.", self.normal_style))
+                labels, columns, statuses = self._bucketed_columns(result)
+            else:
+                labels = [f'Year-{year}' for year in result.years.tolist()]
+                columns = [[self.format_currency(amount) for amount in column.tolist()]
+                           for column in self._amount_columns(result)]
+                statuses = [str(status) for status in result.status]
+            rows = [[label, *row] for label, row in zip(labels, zip(*columns, statuses))]
+            if self.table_mode == 'full':
+                story.append(self._detailed_table(rows))
+            else:
+                # Fixed-size tables with fixed row heights keep layout cost
+                # linear in the horizon: nothing needs splitting or measuring
+                for start in range(0, len(rows), self.table_page_rows):
+                    story.append(self._detailed_table(rows[start:start + self.table_page_rows], row_height=14))
+                    story.append(Spacer(1, 6))
             story.append(Spacer(1, 12))
 
         # Add chart
-        principal_buffer, income_buffer = self.create_retirement_chart(results, client_name)
+        principal_buffer, income_buffer = self.create_retirement_chart(result, client_name)
         if principal_buffer and income_buffer:
             img_principal = Image(principal_buffer, width=6*inch, height=4*inch)
             img_income = Image(income_buffer, width=6*inch, height=4*inch)
@@ -262,6 +372,35 @@ class RetirementReportGenerator:
             story.append(img_income)
         story.append(Spacer(1, 24))
 
+    DETAILED_HEADER = ["Year", "Principal", "Income (Pre-Tax)", "Real Income (Post-Tax)", "Projected Spend", "Surplus", "Status"]
+
+    @staticmethod
+    def _amount_columns(result):
+        return (result.principal, result.income, result.real_income, result.projected_spend, result.surplus)
+
+    def _bucketed_columns(self, result):
+        """Row labels, formatted amount columns and statuses summarizing each band of years"""
+        size = self.table_bucket_years
+        starts = np.arange(0, len(result), size)
+        ends = np.minimum(starts + size, len(result)) - 1
+        years = result.years
+        labels = [f'Years {years[a]}-{years[b]}' if a != b else f'Year-{years[a]}'
+                  for a, b in zip(starts.tolist(), ends.tolist())]
+        principal, *flows = self._amount_columns(result)
+        columns = [principal[ends]] + [np.add.reduceat(column, starts) for column in flows]
+        retire = np.add.reduceat(result.status == 'Retire', starts)
+        counts = ends - starts + 1
+        statuses = ['Retire' if r == n else 'Keep Working' if r == 0 else f'Retire {r}/{n} yrs'
+                    for r, n in zip(retire.tolist(), counts.tolist())]
+        return labels, [[self.format_currency(amount) for amount in column.tolist()] for column in columns], statuses
+
+    def _detailed_table(self, rows, row_height=None):
+        table = Table([self.DETAILED_HEADER] + rows,
+                      colWidths=[0.8*inch, 1*inch, 1*inch, 1.2*inch, 1*inch, 1*inch, 1*inch],
+                      rowHeights=row_height, repeatRows=1)
+        table.setStyle(self.detailed_table_style)
+        return table
+
     def _render_mc_simulation(self, story, sim_data):
         """Helper to render a single Monte Carlo simulation section."""
         parameters = sim_data.get('parameters', {})
@@ -314,17 +453,101 @@ class RetirementReportGenerator:
 
         # Add chart
         if success_rates:
-            target_rate = parameters.get('target_success_rate', 0.9)
-            chart_buffer = self.create_monte_carlo_chart(success_rates, target_rate)
+            chart_buffer = self.create_monte_carlo_chart(*self._mc_chart_args(sim_data))
             if chart_buffer:
                 img = Image(chart_buffer, width=6*inch, height=4*inch)
                 story.append(img)
         story.append(Spacer(1, 24))
 
+    @staticmethod
+    def _mc_chart_args(sim_data):
+        success_rates = sim_data.get('results', {}).get('success_rates', [])
+        return success_rates, sim_data.get('parameters', {}).get('target_success_rate', 0.9)
+
+    def draw_charts(self, client_data, simulations):
+        """Draw every chart of a client's report; returns the PNGs keyed by chart cache key"""
+        basic_sims, mc_sims, sweep_sims = self._split_simulations(simulations)
+        previous, self.charts = self.charts, _ChartCollector()
+        try:
+            for task in self._chart_tasks(basic_sims, mc_sims, sweep_sims, client_data.get('name', 'Client')):
+                task()
+            return dict(self.charts)
+        finally:
+            self.charts = previous
+
+    def _prerender_charts(self, basic_sims, mc_sims, sweep_sims, client_name):
+        """Draw every chart of a report concurrently, so laying out the report only reads the cache"""
+        tasks = self._chart_tasks(basic_sims, mc_sims, sweep_sims, client_name)
+        if len(tasks) < 2:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.chart_workers, len(tasks))) as pool:
+            for future in [pool.submit(task) for task in tasks]:
+                future.result()
+
+    @staticmethod
+    def _split_simulations(simulations):
+        # Accept both 'monte_carlo' and 'monteCarlo' as MC types
+        basic_sims = [s for s in simulations if s.get('type') == 'basic']
+        mc_sims = [s for s in simulations if s.get('type') in ('monte_carlo', 'monteCarlo')]
+        sweep_sims = [s for s in simulations if s.get('type') == 'sweep']
+        return basic_sims, mc_sims, sweep_sims
+
+    def _chart_tasks(self, basic_sims, mc_sims, sweep_sims, client_name):
+        tasks = []
+        for sim in basic_sims:
+            results = sim.get('data', sim).get('results', {})
+            tasks.append(lambda results=results: self.create_retirement_chart(results, client_name))
+        for sim in mc_sims:
+            success_rates, target_rate = self._mc_chart_args(sim.get('data', sim))
+            if success_rates:
+                tasks.append(lambda rates=success_rates, target=target_rate: self.create_monte_carlo_chart(rates, target))
+        for sim in sweep_sims:
+            sweep = sim.get('data', sim).get('results', {})
+            if sweep.get('values'):
+                tasks.append(lambda sweep=sweep: self.create_sweep_heatmap(sweep))
+        return tasks
+
+    def _render_sweep(self, story, sim_data):
+        """Helper to render a single sensitivity sweep section."""
+        sweep = sim_data.get('results', {})
+
+        story.append(Paragraph(f"Sensitivity Sweep from: {sim_data.get('created_at', 'N/A')}", self.subsection_style))
+        story.append(Spacer(1, 12))
+
+        if sweep.get('values'):
+            x_name, y_name = sweep['x_axis']['name'], sweep['y_axis']['name']
+            metric = 'success rate' if sweep.get('metric', 'success_rate') == 'success_rate' else 'median final balance'
+            story.append(Paragraph(f"Projected {metric} as {x_name} and {y_name} vary. "
+                                   f"Every cell uses the same market scenarios, so differences between cells "
+                                   f"reflect the parameters alone.", self.normal_style))
+            story.append(Spacer(1, 8))
+            img = Image(self.create_sweep_heatmap(sweep), width=6*inch, height=4.1*inch)
+            story.append(img)
+        story.append(Spacer(1, 24))
+
     def create_report(self, client_data, simulations):
         """Create a consolidated PDF report for a client."""
+        return self._build_pdf(self.build_story(client_data, simulations))
+
+    def create_combined_report(self, clients):
+        """Create one PDF holding the reports of several (client_data, simulations) pairs."""
+        story = []
+        for client_data, simulations in clients:
+            if story:
+                story.append(PageBreak())
+            story.extend(self.build_story(client_data, simulations))
+        return self._build_pdf(story)
+
+    def _build_pdf(self, story):
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
+        with metrics.phase('pdf_build'):
+            doc.build(story)
+        buffer.seek(0)
+        return buffer
+
+    def build_story(self, client_data, simulations):
+        """Build the flowables of one client's report."""
         story = []
         # Title page and Client Info
         story.append(Paragraph("Retirement Simulation Report", self.title_style))
@@ -351,9 +574,10 @@ class RetirementReportGenerator:
         story.append(Spacer(1, 20))
         story.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", self.normal_style))
         story.append(PageBreak())
-        # Accept both 'monte_carlo' and 'monteCarlo' as MC types
-        basic_sims = [s for s in simulations if s.get('type') == 'basic']
-        mc_sims = [s for s in simulations if s.get('type') in ('monte_carlo', 'monteCarlo')]
+        basic_sims, mc_sims, sweep_sims = self._split_simulations(simulations)
+        if self.chart_workers > 1:
+            with metrics.phase('chart_render'):
+                self._prerender_charts(basic_sims, mc_sims, sweep_sims, client_data.get('name', 'Client'))
         # Section 1: Basic Simulations
         if basic_sims:
             story.append(Paragraph("Section 1: Basic Simulation Analysis", self.section_style))
@@ -367,6 +591,13 @@ class RetirementReportGenerator:
             for sim in mc_sims:
                 sim_data = sim.get('data', sim)
                 self._render_mc_simulation(story, sim_data)
+        # Section 3: Sensitivity Analysis
+        if sweep_sims:
+            story.append(PageBreak())
+            story.append(Paragraph("Section 3: Sensitivity Analysis", self.section_style))
+            for sim in sweep_sims:
+                sim_data = sim.get('data', sim)
+                self._render_sweep(story, sim_data)
         # --- INSIGHTS/RECOMMENDATIONS SECTION (now deduplicated) ---
         if basic_sims or mc_sims:
             story.append(PageBreak())
@@ -389,11 +620,76 @@ class RetirementReportGenerator:
                     seen.add(rec)
             for rec in unique_recs:
                 story.append(Paragraph(rec, self.normal_style))
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return story
+
+def generate_retirement_report(client_data, simulations, **options):
+    """Generate a consolidated retirement simulation PDF report for a client.
+
+    options are passed to RetirementReportGenerator, e.g. table_mode='bucketed'.
+    """
+    generator = RetirementReportGenerator(**options)
+    return generator.create_report(client_data, simulations) 
+# Bulk reports render in a process pool. Each worker builds one generator,
+# styles included, when it starts and reuses it for every report it renders.
+# gunicorn.conf.py sizes it to this worker's share of the CPUs unless
+# REPORT_POOL_WORKERS is set.
+REPORT_POOL_WORKERS = int(os.getenv('REPORT_POOL_WORKERS') or os.cpu_count() or 1)
+_report_pool = None
+_report_pool_lock = threading.Lock()
+_worker_generator = None
+
+def _init_report_worker():
+    global _worker_generator
+    _worker_generator = RetirementReportGenerator(chart_workers=1)
+
+def _render_report_in_worker(client_data, simulations):
+    return _worker_generator.create_report(client_data, simulations).getvalue()
+
+def _draw_charts_in_worker(client_data, simulations):
+    return _worker_generator.draw_charts(client_data, simulations)
+
+def configure_report_pool(max_workers):
+    """Set the size of the report process pool, replacing any existing pool"""
+    global REPORT_POOL_WORKERS
+    shutdown_report_pool()
+    REPORT_POOL_WORKERS = max(1, int(max_workers))
+
+def get_report_pool():
+    global _report_pool
+    with _report_pool_lock:
+        if _report_pool is None:
+            _report_pool = ProcessPoolExecutor(max_workers=REPORT_POOL_WORKERS, mp_context=process_pool_context(),
+                                               initializer=_init_report_worker)
+        return _report_pool
+
+def shutdown_report_pool():
+    global _report_pool
+    with _report_pool_lock:
+        if _report_pool is not None:
+            _report_pool.shutdown()
+            _report_pool = None
+
+def iter_client_reports(clients):
+    """Render (client_data, simulations) pairs in the report pool.
+
+    Yields (index, pdf_bytes, error) as each report finishes, not in input
+    order. A report that failed has pdf_bytes None and the exception as
+    error, so one bad client does not stop the others.
+    """
+    pool = get_report_pool()
+    futures = {pool.submit(_render_report_in_worker, client_data, simulations): index
+               for index, (client_data, simulations) in enumerate(clients)}
+    for future in as_completed(futures):
+        error = future.exception()
+        yield futures[future], None if error else future.result(), error
 
-def generate_retirement_report(client_data, simulations):
-    """Generate a consolidated retirement simulation PDF report for a client."""
-    generator = RetirementReportGenerator()
-    return generator.create_report(client_data, simulations) 
\ No newline at end of file
+def generate_combined_report(clients):
+    """One PDF for several (client_data, simulations) pairs, with the charts drawn in the report pool."""
+    pool = get_report_pool()
+    charts = _ChartCollector()
+    futures = [pool.submit(_draw_charts_in_worker, client_data, simulations) for client_data, simulations in clients]
+    with metrics.phase('chart_render'):
+        for future in futures:
+            charts.update(future.result())
+    generator = RetirementReportGenerator(charts=charts, chart_workers=1)
+    return generator.create_combined_report(clients)
@@ -1,72 +1,682 @@
+import multiprocessing
+import os
+import threading
+from functools import lru_cache
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
+class SimulationResult:
+    """Year-by-year output of simulation(), one array per field indexed by year - 1.
+
+    The legacy {'Year-N': {...}} shape is only built by to_dict() at the HTTP
+    boundary; from_dict() parses it back once for stored simulations.
+    """
+    __slots__ = ('principal', 'income', 'real_income', 'projected_spend', 'surplus', 'status')
+
+    # Column name in the legacy dict shape for each attribute
+    FIELDS = (
+        ('principal', 'principal'),
+        ('income', 'income'),
+        ('real_income', 'real_income cap'),
+        ('projected_spend', 'projected_spend'),
+        ('surplus', 'surplus'),
+    )
+
+    def __init__(self, principal, income, real_income, projected_spend, surplus, status=None):
+        self.principal = np.asarray(principal, dtype=float)
+        self.income = np.asarray(income, dtype=float)
+        self.real_income = np.asarray(real_income, dtype=float)
+        self.projected_spend = np.asarray(projected_spend, dtype=float)
+        self.surplus = np.asarray(surplus, dtype=float)
+        if status is None:
+            status = np.where(self.surplus >= 0, 'Retire', 'Keep Working')
+        self.status = np.asarray(status, dtype=object)
+
+    def __len__(self):
+        return len(self.principal)
+
+    @property
+    def years(self):
+        return np.arange(1, len(self) + 1)
+
+    def columns(self):
+        """Each field's array keyed by its legacy column name, status last"""
+        columns = {key: getattr(self, attr) for attr, key in self.FIELDS}
+        columns['status'] = self.status
+        return columns
+
+    def to_dict(self):
+        columns = self.columns()
+        rows = zip(*(column.tolist() for column in columns.values()))
+        return {
+            f'Year-{i + 1}': dict(zip(columns, row))
+            for i, row in enumerate(rows)
+        }
+
+    @classmethod
+    def from_dict(cls, results):
+        """Build a result from the legacy Year-N dict; missing values become NaN"""
+        rows = [row for _, row in sorted(results.items(), key=lambda item: int(item[0].split('-')[1]))]
+        columns = {
+            attr: [np.nan if row.get(key) is None else row[key] for row in rows]
+            for attr, key in cls.FIELDS
+        }
+        return cls(status=[row.get('status', '') for row in rows], **columns)
+
+def as_simulation_result(results):
+    return results if isinstance(results, SimulationResult) else SimulationResult.from_dict(results)
+
 # Core simulation function
+# Steps the balance through the years with the same float operations, in the
+# same order, as the original per-year loop, then rounds every column at once.
+# Only the two running values stay in Python; a closed form drifts in the last
+# bits and lands on the other side of a half cent often enough to matter.
 def simulation(balance, apy, draw, duration, curr_exp, tax_rate, inflation, annual_contrib, 
                annual_contrib_years=0, drawdown_start=0):
-    princ, salary, real_income, spend, label, surplus, status = [], [], [], [], [], [], []
+    princ, spend = [], []
     for year in range(duration):
         if year > 0:
             curr_exp *= (1 + inflation)
-        spend.append(round(curr_exp, 2))
+        spend.append(curr_exp)
         balance *= (1 + apy)
-        contrib = annual_contrib if year < annual_contrib_years else 0
-        balance += contrib
+        balance += annual_contrib if year < annual_contrib_years else 0
         balance -= curr_exp
-        princ.append(round(balance, 2))
+        princ.append(balance)
+    columns = _cent_columns(np.array(princ, dtype=float), np.array(spend, dtype=float),
+                            draw, tax_rate, drawdown_start)
+    return SimulationResult(*(columns[field] for _, field in SimulationResult.FIELDS))
+
+def round_cents(values):
+    """Round to cents exactly as Python's round(x, 2) does, elementwise.
+
+    np.round scales by 100 first, and that product can land on the other side
+    of a half cent (np.round(2.675, 2) is 2.68, round(2.675, 2) is 2.67). Only
+    values whose scaled form sits within a few ulps of a half cent can
+    disagree, so those few are rounded in Python.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    if near.any():
+        rounded[near] = [round(value, 2) for value in values[near].tolist()]
+    return rounded
+
+def _cent_columns(princ, spend, draw, tax_rate, drawdown_start):
+    """Output columns from unrounded (..., years) principal and spend, rounded as the original loop did"""
+    princ = round_cents(princ)
+    spend = round_cents(spend)
+    drawing = np.arange(princ.shape[-1]) >= _per_year(drawdown_start)
+    salary = round_cents(np.where(drawing, princ * _per_year(draw), 0.0))
+    real_income = round_cents(salary * (1 - _per_year(tax_rate)))
+    surplus = round_cents(real_income - spend)
+    return {
+        'principal': princ,
+        'income': salary,
+        'real_income cap': real_income,
+        'projected_spend': spend,
+        'surplus': surplus,
+    }
+
+# Batched projection over many paths at once. Same recurrence and rounding as
+# simulation(), but every intermediate is a (paths,) vector and each output
+# is a (paths, years) matrix. Rates carry a trailing year axis: length 1 holds
+# the rate constant for the whole horizon, length `duration` gives one rate
+# per year. A 1-D array is one constant rate per path. The other parameters
+# may be scalars or arrays that broadcast against the paths, which lets one
+# call evaluate many scenarios side by side.
+def simulate_paths(balance, apy, draw, duration, curr_exp, tax_rate, inflation, annual_contrib,
+                   annual_contrib_years=0, drawdown_start=0):
+    princ, spend = _balance_paths(balance, apy, draw, duration, curr_exp, tax_rate, inflation,
+                                  annual_contrib, annual_contrib_years, drawdown_start)
+    return _cent_columns(np.moveaxis(princ, 0, -1), np.moveaxis(spend, 0, -1), draw, tax_rate, drawdown_start)
+
+def _balance_paths(balance, apy, draw, duration, curr_exp, tax_rate, inflation, annual_contrib,
+                   annual_contrib_years=0, drawdown_start=0):
+    """Unrounded (years, *paths) principal and spend from the balance recurrence"""
+    apy = _as_rate_matrix(apy)
+    inflation = _as_rate_matrix(inflation)
+    paths = np.broadcast_shapes(apy.shape[:-1], inflation.shape[:-1], np.shape(balance), np.shape(draw),
+                                np.shape(curr_exp), np.shape(tax_rate), np.shape(annual_contrib),
+                                np.shape(annual_contrib_years), np.shape(drawdown_start))
+    balance = np.array(np.broadcast_to(balance, paths), dtype=float)
+    curr_exp = np.array(np.broadcast_to(curr_exp, paths), dtype=float)
+    # Year-major buffers keep each year's writes contiguous
+    princ = np.empty((duration,) + paths)
+    spend = np.empty((duration,) + paths)
     for year in range(duration):
-        inc = princ[year] * draw if year >= drawdown_start else 0
-        salary.append(round(inc, 2))
-    for inc in salary:
-        net = inc * (1 - tax_rate)
-        real_income.append(round(net, 2))
-    for i in range(duration):
-        yr_label = f'Year-{i + 1}'
-        label.append(yr_label)
-        sur = real_income[i] - spend[i]
-        surplus.append(round(sur, 2))
-        note = 'Retire' if sur >= 0 else 'Keep Working'
-        status.append(note)
-    combined = {
-        f'Year-{i + 1}': {
-            'principal': princ[i],
-            'income': salary[i],
-            'real_income cap': real_income[i],
-            'projected_spend': spend[i],
-            'surplus': surplus[i],
-            'status': status[i]
-        }
-        for i in range(duration)
+        if year > 0:
+            curr_exp *= (1 + _rate_for_year(inflation, year))
+        spend[year] = curr_exp
+        balance *= (1 + _rate_for_year(apy, year))
+        contrib = np.where(year < np.asarray(annual_contrib_years), annual_contrib, 0)
+        balance += contrib
+        balance -= curr_exp
+        princ[year] = balance
+    return princ, spend
+
+# Cent rounding in simulate_paths moves a surplus by a few cents at most, so
+# any unrounded surplus further than this from zero already has its sign.
+_SIGN_MARGIN = 1.0
+
+def _surplus_nonnegative(balance, apy, draw, duration, curr_exp, tax_rate, inflation, annual_contrib,
+                         annual_contrib_years=0, drawdown_start=0):
+    """(paths, years) mask of surplus >= 0, matching simulate_paths without rounding every cell"""
+    princ, spend = _balance_paths(balance, apy, draw, duration, curr_exp, tax_rate, inflation,
+                                  annual_contrib, annual_contrib_years, drawdown_start)
+    years = np.arange(duration).reshape((duration,) + (1,) * (princ.ndim - 1))
+    drawing = np.broadcast_to(years >= np.asarray(drawdown_start), princ.shape)
+    rough = np.where(drawing, princ * (draw * (1 - np.asarray(tax_rate))), 0.0) - spend
+    success = rough >= 0
+    near = np.abs(rough) < _SIGN_MARGIN
+    if near.any():
+        # Redo the exact rounding chain for the few cells close to break-even
+        draw = np.broadcast_to(draw, princ.shape)[near]
+        tax_rate = np.broadcast_to(tax_rate, princ.shape)[near]
+        salary = round_cents(np.where(drawing[near], round_cents(princ[near]) * draw, 0.0))
+        surplus = round_cents(round_cents(salary * (1 - tax_rate)) - round_cents(spend[near]))
+        success[near] = surplus >= 0
+    return np.moveaxis(success, 0, -1)
+
+def _per_year(value):
+    # Add a year axis so per-path parameters broadcast against (paths, years)
+    return np.asarray(value)[..., np.newaxis]
+
+def _as_rate_matrix(rate):
+    rate = np.asarray(rate, dtype=float)
+    return rate[..., np.newaxis] if rate.ndim < 2 else rate
+
+def _rate_for_year(rate, year):
+    return rate[..., year if rate.shape[-1] > 1 else 0]
+
+# Paths are drawn in fixed-size blocks, each from its own child of the run's
+# SeedSequence. A block's numbers depend only on the seed and the block's
+# index, so any split of the blocks across workers reproduces a single-process
+# run exactly.
+PATH_BLOCK_SIZE = 1000
+
+def _path_blocks(seed, simulations):
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    sizes = [min(PATH_BLOCK_SIZE, simulations - start) for start in range(0, simulations, PATH_BLOCK_SIZE)]
+    return list(zip(root.spawn(len(sizes)), sizes))
+
+# Sampling schemes for the return and inflation draws. 'antithetic' pairs
+# every draw with its negation; 'halton' uses a randomized Halton sequence
+# mapped through the normal quantile. Each block is split into
+# REPLICATES_PER_BLOCK sub-blocks with their own pairs or random Halton
+# shift, so every sub-block is an independent, unbiased replicate and even a
+# single-block run has enough of them for the spread between replicates to
+# measure the precision actually achieved.
+SAMPLING_METHODS = ('random', 'antithetic', 'halton')
+REPLICATES_PER_BLOCK = 20
+
+def _replicate_sizes(blocks):
+    """Path count of each replicate of the given blocks, in path order"""
+    return [len(part) for _, size in blocks
+            for part in np.array_split(np.arange(size), min(REPLICATES_PER_BLOCK, size))]
+
+def _draw_normals(blocks, years, sampling='random'):
+    # One generator call per block draws returns and inflation together
+    if sampling == 'random':
+        draws = [np.random.default_rng(block_seed).standard_normal((2, size, years)) for block_seed, size in blocks]
+    elif sampling == 'antithetic':
+        draws = [_replicated(_antithetic_normals, block, years) for block in blocks]
+    elif sampling == 'halton':
+        draws = [_replicated(_halton_normals, block, years) for block in blocks]
+    else:
+        raise ValueError(f"Unknown sampling method: {sampling}")
+    return np.concatenate(draws, axis=1)
+
+def _replicated(scheme, block, years):
+    rng = np.random.default_rng(block[0])
+    return np.concatenate([scheme(rng, size, years) for size in _replicate_sizes([block])], axis=1)
+
+def _antithetic_normals(rng, size, years):
+    half = rng.standard_normal((2, (size + 1) // 2, years))
+    return np.concatenate([half, -half], axis=1)[:, :size]
+
+def _halton_normals(rng, size, years):
+    points = (_halton_points(size, 2 * years) + rng.random(2 * years)) % 1.0
+    return _normal_quantile(points).T.reshape(2, years, size).transpose(0, 2, 1)
+
+@lru_cache(maxsize=32)
+def _halton_points(size, dims):
+    """First `size` points (from index 1) of the dims-dimensional Halton sequence"""
+    primes = _first_primes(dims)
+    index = np.arange(1, size + 1)
+    points = np.empty((size, dims))
+    for d, base in enumerate(primes):
+        n = index.copy()
+        value = np.zeros(size)
+        factor = 1.0 / base
+        while n.any():
+            n, digit = np.divmod(n, base)
+            value += digit * factor
+            factor /= base
+        points[:, d] = value
+    points.flags.writeable = False
+    return points
+
+def _first_primes(count):
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+def _normal_quantile(p):
+    """Inverse standard normal CDF (Acklam's rational approximation, relative error < 1.2e-9)"""
+    a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+    p = np.clip(p, 1e-300, 1 - 1e-16)
+    q = np.minimum(p, 1 - p)
+    tail = q < 0.02425
+    # Central region
+    r = (p - 0.5) ** 2
+    central = ((((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * (p - 0.5) /
+               (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1))
+    # Tails, by symmetry from the lower one
+    t = np.sqrt(-2 * np.log(np.where(tail, q, 0.5)))
+    lower = ((((((c[0] * t + c[1]) * t + c[2]) * t + c[3]) * t + c[4]) * t + c[5]) /
+             ((((d[0] * t + d[1]) * t + d[2]) * t + d[3]) * t + 1))
+    return np.where(tail, np.where(p < 0.5, lower, -lower), central)
+
+def _normal_rates(mean, sd, normals):
+    mean = np.asarray(mean, dtype=float)[..., np.newaxis, np.newaxis]
+    sd = np.asarray(sd, dtype=float)[..., np.newaxis, np.newaxis]
+    return mean + sd * normals
+
+def _path_inputs(blocks, model, annual_returns=False, sampling='random'):
+    """simulate_paths() arguments for the given blocks of a Monte Carlo model.
+
+    The draws are built for exactly these blocks, so callers pass one chunk
+    (see _block_chunks) at a time rather than a whole run.
+
+    Model values may be arrays with a leading scenario axis; every scenario
+    then sees the same draws and the paths gain that axis too.
+    """
+    years = model['duration'] if annual_returns else 1
+    return _rate_inputs(model, _draw_normals(blocks, years, sampling))
+
+def _rate_inputs(model, normals):
+    """simulate_paths() arguments for a model and its (2, paths, years) return and inflation draws"""
+    inputs = {key: _per_year(model[key]) for key in
+              ('balance', 'draw', 'curr_exp', 'tax_rate', 'annual_contrib', 'annual_contrib_years', 'drawdown_start')}
+    inputs['apy'] = _normal_rates(model['apy_mean'], model['apy_sd'], normals[0])
+    inputs['inflation'] = _normal_rates(model['inflation_mean'], model['inflation_sd'], normals[1])
+    inputs['duration'] = model['duration']
+    return inputs
+
+# Blocks are simulated a chunk of at most MC_CHUNK_PATHS paths at a time, and
+# only the per-year counts are kept between chunks, so a run's memory is
+# bounded by one chunk's draws and balance paths however many paths it has.
+CHUNK_PATHS = int(os.getenv('MC_CHUNK_PATHS', 10000))
+
+def _block_chunks(blocks):
+    step = max(1, CHUNK_PATHS // PATH_BLOCK_SIZE)
+    return [blocks[start:start + step] for start in range(0, len(blocks), step)]
+
+def _success_counts(blocks, model, annual_returns=False, sampling='random'):
+    """Count the paths with a non-negative surplus in each year over the given blocks"""
+    counts = 0
+    for chunk in _block_chunks(blocks):
+        success = _surplus_nonnegative(**_path_inputs(chunk, model, annual_returns, sampling))
+        counts = counts + np.count_nonzero(success, axis=-2)
+    return counts
+
+def _replicate_success_counts(blocks, model, annual_returns=False, sampling='random'):
+    """Per-replicate success counts, shape (replicates, years)"""
+    counts = []
+    for chunk in _block_chunks(blocks):
+        success = _surplus_nonnegative(**_path_inputs(chunk, model, annual_returns, sampling))
+        starts = np.cumsum([0] + _replicate_sizes(chunk)[:-1])
+        counts.append(np.add.reduceat(success, starts, axis=-2, dtype=np.int64))
+    return np.concatenate(counts, axis=-2)
+
+# Process pool for sharded runs. Created on first use and kept for the life of
+# the process so requests don't pay worker startup. gunicorn.conf.py sizes it
+# to this worker's share of the CPUs unless MC_POOL_WORKERS is set.
+_process_pool = None
+_process_pool_size = int(os.getenv('MC_POOL_WORKERS') or os.cpu_count() or 1)
+# Requests run on several threads of a gunicorn worker; only one creates the pool
+_process_pool_lock = threading.Lock()
+
+def process_pool_context():
+    """Start method for worker pools: a gunicorn worker runs request and job
+    threads, so pool processes come from a fork server (or are spawned where
+    there is none) rather than forking the threaded worker itself."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def configure_process_pool(max_workers):
+    """Set the size of the shared Monte Carlo process pool, replacing any existing pool"""
+    global _process_pool_size
+    shutdown_process_pool()
+    _process_pool_size = max(1, int(max_workers))
+
+def get_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=_process_pool_size, mp_context=process_pool_context())
+        return _process_pool
+
+def shutdown_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown()
+            _process_pool = None
+
+def _sharded_success_counts(blocks, model, annual_returns, workers, sampling='random', per_replicate=False):
+    # Contiguous runs of blocks, one per shard; counts merge exactly by summing
+    # (or, per replicate, by concatenating in block order)
+    shards = np.array_split(np.arange(len(blocks)), min(workers, _process_pool_size, len(blocks)))
+    pool = get_process_pool()
+    count = _replicate_success_counts if per_replicate else _success_counts
+    futures = [pool.submit(count, [blocks[i] for i in shard], model, annual_returns, sampling)
+               for shard in shards]
+    if per_replicate:
+        return np.concatenate([future.result() for future in futures])
+    return sum(future.result() for future in futures)
+
+def _replicate_standard_errors(replicate_counts, sizes):
+    """Standard error of the pooled success rates, estimated from the spread between replicates"""
+    sizes = np.asarray(sizes, dtype=float)
+    total = sizes.sum()
+    if len(sizes) < 2:
+        return standard_error(replicate_counts.sum(axis=0) / total, total)
+    deviations = replicate_counts - sizes[:, np.newaxis] * (replicate_counts.sum(axis=0) / total)
+    return np.sqrt(len(sizes) / (len(sizes) - 1) * np.sum(deviations ** 2, axis=0)) / total
+
+def variance_reduction(success_rates, paths, standard_errors):
+    """Plain Monte Carlo variance over the achieved variance of the success rates.
+
+    Summed over the years, so 4.0 means plain sampling would need about four
+    times the paths for the same precision. None when it cannot be estimated,
+    e.g. when every year's outcome is certain.
+    """
+    plain = np.sum(standard_error(success_rates, paths) ** 2)
+    achieved = np.sum(np.asarray(standard_errors) ** 2)
+    if plain == 0 or achieved == 0:
+        return None
+    return float(plain / achieved)
+
+def _model(balance, draw, duration, curr_exp, tax_rate, apy_mean, apy_sd, inflation_mean,
+           inflation_sd, annual_contrib, annual_contrib_years, drawdown_start):
+    return {
+        'balance': balance, 'draw': draw, 'duration': duration, 'curr_exp': curr_exp,
+        'tax_rate': tax_rate, 'apy_mean': apy_mean, 'apy_sd': apy_sd,
+        'inflation_mean': inflation_mean, 'inflation_sd': inflation_sd,
+        'annual_contrib': annual_contrib, 'annual_contrib_years': annual_contrib_years,
+        'drawdown_start': drawdown_start,
     }
-    return combined
+
+def standard_error(success_rates, paths):
+    """Binomial standard error of success rates estimated from `paths` paths"""
+    success_rates = np.asarray(success_rates, dtype=float)
+    return np.sqrt(success_rates * (1 - success_rates) / paths)
+
+def _wilson_interval(successes, n, z):
+    """Wilson score interval for a binomial proportion, elementwise"""
+    p = successes / n
+    centre = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+    half_width = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (1 + z**2 / n)
+    return centre - half_width, centre + half_width
 
 def monte_carlo_retirement(
     balance, draw, duration, curr_exp, tax_rate, 
     apy_mean, apy_sd, inflation_mean, inflation_sd, 
     annual_contrib, annual_contrib_years, drawdown_start,
-    simulations=1000):
-    success_matrix = []
-    for _ in range(simulations):
-        apy = np.random.normal(apy_mean, apy_sd)
-        inflation = np.random.normal(inflation_mean, inflation_sd)
-        result = simulation(balance, apy, draw, duration, curr_exp, tax_rate, inflation, 
-                            annual_contrib, annual_contrib_years, drawdown_start)
-        yearly_success = [result[f'Year-{i+1}']['surplus'] >= 0 for i in range(duration)]
-        success_matrix.append(yearly_success)
-    success_matrix = np.array(success_matrix)
-    success_rates = success_matrix.mean(axis=0)
+    simulations=1000, annual_returns=False, seed=None, workers=None, sampling='random',
+    return_standard_errors=False):
+    # annual_returns draws a fresh return and inflation rate for every year of
+    # every path instead of one pair per path held for the whole horizon.
+    # seed may be an int or a numpy SeedSequence; None draws fresh entropy.
+    # workers > 1 shards the paths across the shared process pool.
+    # sampling is one of SAMPLING_METHODS; return_standard_errors also
+    # returns each year's standard error, which reflects the sampling used.
+    model = _model(balance, draw, duration, curr_exp, tax_rate, apy_mean, apy_sd,
+                   inflation_mean, inflation_sd, annual_contrib, annual_contrib_years, drawdown_start)
+    blocks = _path_blocks(seed, simulations)
+    counts = _run_blocks(blocks, model, annual_returns, workers, sampling)
+    success_rates = _pooled(counts, sampling) / simulations
+    if return_standard_errors:
+        return success_rates, _standard_errors(counts, blocks, sampling)
     return success_rates
 
+def _run_blocks(blocks, model, annual_returns, workers, sampling):
+    # Plain sampling only needs the pooled counts; the other schemes keep
+    # per-replicate counts, shape (replicates, years), to measure their precision
+    per_replicate = sampling != 'random'
+    if workers and workers > 1 and len(blocks) > 1:
+        return _sharded_success_counts(blocks, model, annual_returns, workers, sampling, per_replicate)
+    if per_replicate:
+        return _replicate_success_counts(blocks, model, annual_returns, sampling)
+    return _success_counts(blocks, model, annual_returns, sampling)
+
+def _pooled(counts, sampling):
+    return counts if sampling == 'random' else counts.sum(axis=0)
+
+def _standard_errors(counts, blocks, sampling):
+    if sampling == 'random':
+        paths = sum(size for _, size in blocks)
+        return standard_error(counts / paths, paths)
+    return _replicate_standard_errors(counts, _replicate_sizes(blocks))
+
+def iter_monte_carlo(
+    balance, draw, duration, curr_exp, tax_rate,
+    apy_mean, apy_sd, inflation_mean, inflation_sd,
+    annual_contrib, annual_contrib_years, drawdown_start,
+    simulations=1000, annual_returns=False, seed=None, workers=None, batch_paths=10000,
+    sampling='random'):
+    # Runs the same seeded blocks as monte_carlo_retirement() a batch at a
+    # time, yielding the paths done so far, their per-year success rates and
+    # the standard errors of those rates. The last yield equals
+    # monte_carlo_retirement() with return_standard_errors.
+    model = _model(balance, draw, duration, curr_exp, tax_rate, apy_mean, apy_sd,
+                   inflation_mean, inflation_sd, annual_contrib, annual_contrib_years, drawdown_start)
+    blocks = _path_blocks(seed, simulations)
+    step = max(1, batch_paths // PATH_BLOCK_SIZE)
+    counts = None
+    for end in range(step, len(blocks) + step, step):
+        batch = _run_blocks(blocks[end - step:end], model, annual_returns, workers, sampling)
+        if counts is None:
+            counts = batch
+        elif sampling == 'random':
+            counts = counts + batch
+        else:
+            counts = np.concatenate([counts, batch])
+        done = blocks[:end]
+        paths = sum(size for _, size in done)
+        yield paths, _pooled(counts, sampling) / paths, _standard_errors(counts, done, sampling)
+
+def monte_carlo_adaptive(
+    balance, draw, duration, curr_exp, tax_rate,
+    apy_mean, apy_sd, inflation_mean, inflation_sd,
+    annual_contrib, annual_contrib_years, drawdown_start,
+    tolerance=0.01, min_simulations=2000, max_simulations=100000,
+    annual_returns=False, seed=None, workers=None, batch_paths=5000, sampling='random'):
+    # Adds batches of paths until every year's standard error is below
+    # tolerance (after at least min_simulations paths) or max_simulations is
+    # reached. Returns the success rates, the number of paths used and the
+    # standard errors; for a given seed the rates equal
+    # monte_carlo_retirement() with that many paths.
+    runs = iter_monte_carlo(balance, draw, duration, curr_exp, tax_rate, apy_mean, apy_sd,
+                            inflation_mean, inflation_sd, annual_contrib, annual_contrib_years,
+                            drawdown_start, max_simulations, annual_returns, seed, workers, batch_paths,
+                            sampling)
+    for paths, success_rates, standard_errors in runs:
+        if paths >= min_simulations and standard_errors.max() < tolerance:
+            break
+    return success_rates, paths, standard_errors
+
+# Scenario batches evaluate many parameter sets in one array computation, one
+# row per scenario. Monte Carlo batches share the same seeded draws across
+# scenarios (common random numbers): each block chunk is drawn once and run
+# against the scenarios a group at a time, a group holding at most
+# MAX_BATCH_PATHS scenario-paths.
+MAX_BATCH_PATHS = int(os.getenv('MAX_BATCH_PATHS', 50000))
+
+SIMULATION_KEYS = ('balance', 'apy', 'draw', 'curr_exp', 'tax_rate', 'inflation',
+                   'annual_contrib', 'annual_contrib_years', 'drawdown_start')
+MONTE_CARLO_KEYS = ('balance', 'draw', 'curr_exp', 'tax_rate', 'apy_mean', 'apy_sd',
+                    'inflation_mean', 'inflation_sd', 'annual_contrib', 'annual_contrib_years',
+                    'drawdown_start')
+
+def _scenario_columns(scenarios, keys):
+    return {key: np.array([scenario[key] for scenario in scenarios]) for key in keys}
+
+def simulation_batch(scenarios):
+    """Run simulation() for a list of parameter dicts; returns one SimulationResult per scenario"""
+    durations = [int(scenario['duration']) for scenario in scenarios]
+    paths = simulate_paths(duration=max(durations, default=0), **_scenario_columns(scenarios, SIMULATION_KEYS))
+    return [
+        SimulationResult(*(paths[field][i, :duration] for _, field in SimulationResult.FIELDS))
+        for i, duration in enumerate(durations)
+    ]
+
+def _scenario_groups(scenarios, duration, simulations):
+    """(rows, model) for groups of scenarios sized to MAX_BATCH_PATHS per block chunk"""
+    paths = min(simulations, max(1, CHUNK_PATHS // PATH_BLOCK_SIZE) * PATH_BLOCK_SIZE)
+    step = max(1, MAX_BATCH_PATHS // max(paths, 1))
+    groups = []
+    for start in range(0, len(scenarios), step):
+        model = _scenario_columns(scenarios[start:start + step], MONTE_CARLO_KEYS)
+        model['duration'] = duration
+        groups.append((slice(start, start + step), model))
+    return groups
+
+def _batch_draws(seed, simulations, duration, annual_returns):
+    # Each block chunk's draws, generated once and shared by every scenario group
+    for block_chunk in _block_chunks(_path_blocks(seed, simulations)):
+        yield _draw_normals(block_chunk, duration if annual_returns else 1)
+
+def monte_carlo_batch(scenarios, simulations=1000, annual_returns=False, seed=None):
+    """success_rates for each of a list of parameter dicts, all scenarios sharing the same draws"""
+    if not scenarios:
+        return []
+    durations = [int(scenario['duration']) for scenario in scenarios]
+    groups = _scenario_groups(scenarios, max(durations), simulations)
+    counts = np.zeros((len(scenarios), max(durations)), dtype=np.int64)
+    for normals in _batch_draws(seed, simulations, max(durations), annual_returns):
+        for rows, model in groups:
+            counts[rows] += np.count_nonzero(_surplus_nonnegative(**_rate_inputs(model, normals)), axis=-2)
+    return [counts[i, :duration] / simulations for i, duration in enumerate(durations)]
+
+def _median_final_balances(scenarios, simulations=1000, annual_returns=False, seed=None):
+    """Median end-of-horizon principal across the Monte Carlo paths of each scenario"""
+    if not scenarios:
+        return []
+    durations = [int(scenario['duration']) for scenario in scenarios]
+    final_years = np.array(durations) - 1
+    groups = _scenario_groups(scenarios, max(durations), simulations)
+    # Only each scenario's rounded final-year principal is kept from a block chunk
+    finals = [[] for _ in groups]
+    for normals in _batch_draws(seed, simulations, max(durations), annual_returns):
+        for (rows, model), group_finals in zip(groups, finals):
+            princ, _ = _balance_paths(**_rate_inputs(model, normals))
+            group_years = final_years[rows]
+            group_finals.append(round_cents(princ[group_years, np.arange(len(group_years))]))
+    return [median for group_finals in finals
+            for median in np.median(np.concatenate(group_finals, axis=-1), axis=-1)]
+
+SWEEP_METRICS = ('success_rate', 'final_balance')
+
+def sensitivity_grid(base, x_axis, x_values, y_axis, y_values, metric='success_rate', year=None,
+                     simulations=1000, annual_returns=False, seed=None):
+    """Evaluate a metric over a two-parameter grid of Monte Carlo scenarios.
+
+    Returns a (len(y_values), len(x_values)) array. 'success_rate' is the
+    success rate in `year` (1-based, at most the shortest duration in the
+    grid; default each cell's final year);
+    'final_balance' is the median principal in the final year. Every cell
+    reuses the same seeded draws, so cell-to-cell differences come from the
+    parameters rather than sampling noise.
+    """
+    scenarios = [dict(base, **{y_axis: y, x_axis: x}) for y in y_values for x in x_values]
+    shortest = min(int(scenario['duration']) for scenario in scenarios)
+    if year is not None and not 1 <= year <= shortest:
+        raise ValueError(f"year must be between 1 and {shortest}, the shortest duration in the grid")
+    if metric == 'success_rate':
+        rates = monte_carlo_batch(scenarios, simulations, annual_returns, seed)
+        values = [cell[(year or len(cell)) - 1] for cell in rates]
+    elif metric == 'final_balance':
+        values = _median_final_balances(scenarios, simulations, annual_returns, seed)
+    else:
+        raise ValueError(f"Unknown sweep metric: {metric}")
+    return np.array(values, dtype=float).reshape(len(y_values), len(x_values))
+
 def find_optimal_retirement_year(
     balance, draw, duration, curr_exp, tax_rate, 
     apy_mean, apy_sd, inflation_mean, inflation_sd, 
     annual_contrib, annual_contrib_years, drawdown_start,
-    simulations=1000, target_success_rate=0.90):
+    simulations=1000, target_success_rate=0.90, annual_returns=False, seed=None, workers=None,
+    sequential=False, confidence=0.95):
+    # sequential adds SEQUENTIAL_LOOK_PATHS paths at a time and stops as soon
+    # as the confidence intervals settle which year first reaches the target.
+    # It uses the same seeded blocks as a full run, so running out of paths
+    # gives the full-run answer.
+    if sequential:
+        year, rate, _ = _sequential_optimal_year(
+            _model(balance, draw, duration, curr_exp, tax_rate, apy_mean, apy_sd, inflation_mean,
+                   inflation_sd, annual_contrib, annual_contrib_years, drawdown_start),
+            simulations, target_success_rate, annual_returns, seed, confidence)
+        return year, rate
     success_rates = monte_carlo_retirement(
         balance, draw, duration, curr_exp, tax_rate, 
         apy_mean, apy_sd, inflation_mean, inflation_sd, 
         annual_contrib, annual_contrib_years, drawdown_start,
-        simulations)
+        simulations, annual_returns, seed, workers)
+    return _first_year_reaching(success_rates, target_success_rate)
+
+def _first_year_reaching(success_rates, target_success_rate):
     for i, rate in enumerate(success_rates):
         if rate >= target_success_rate:
             return f"Year-{i+1}", rate
-    return f"Year-{duration}", success_rates[-1]
+    return f"Year-{len(success_rates)}", success_rates[-1]
+
+# The sequential search looks at the running counts every
+# SEQUENTIAL_LOOK_PATHS paths, so even a single-block run can stop early
+SEQUENTIAL_LOOK_PATHS = 100
+
+def _sequential_optimal_year(model, simulations, target_success_rate, annual_returns, seed, confidence):
+    """(year label, success rate, paths used) of a sequential optimal-year search.
+
+    The Wilson intervals are Bonferroni-corrected over every planned look and
+    every year, so the chance that any interval the stopping rule relies on
+    misses its rate is at most 1 - confidence.
+    """
+    looks = -(-simulations // SEQUENTIAL_LOOK_PATHS)
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / (2 * looks * model['duration']))
+    counts = np.zeros(model['duration'], dtype=np.int64)
+    n = 0
+    for block in _path_blocks(seed, simulations):
+        # The block's draws are made in one call, as in a full run; its paths
+        # are then simulated a look at a time so stopping skips the rest
+        normals = _draw_normals([block], model['duration'] if annual_returns else 1)
+        for start in range(0, block[1], SEQUENTIAL_LOOK_PATHS):
+            look = normals[:, start:start + SEQUENTIAL_LOOK_PATHS]
+            counts += np.count_nonzero(_surplus_nonnegative(**_rate_inputs(model, look)), axis=-2)
+            n += look.shape[1]
+            if _year_is_settled(counts, n, z, target_success_rate):
+                return (*_first_year_reaching(counts / n, target_success_rate), n)
+    return (*_first_year_reaching(counts / n, target_success_rate), n)
+
+def _year_is_settled(counts, n, z, target_success_rate):
+    # Decisive once every earlier year is confidently below the target and
+    # the candidate year (if any) is confidently at or above it
+    lower, upper = _wilson_interval(counts, n, z)
+    reached = np.flatnonzero(counts / n >= target_success_rate)
+    candidate = reached[0] if len(reached) else len(counts)
+    return bool(np.all(upper[:candidate] < target_success_rate) and (
+        candidate == len(counts) or lower[candidate] >= target_success_rate))
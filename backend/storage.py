@@ -0,0 +1,226 @@
+"""
+Persistent SQLite storage for user credits, clients and saved simulations
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    credits INTEGER NOT NULL DEFAULT 0,
+    subscription_status TEXT NOT NULL DEFAULT 'none',
+    unlimited INTEGER NOT NULL DEFAULT 0,
+    patreon_member INTEGER NOT NULL DEFAULT 0,
+    patreon_tier TEXT
+);
+CREATE TABLE IF NOT EXISTS discount_redemptions (
+    user_id TEXT NOT NULL,
+    code TEXT NOT NULL,
+    redeemed_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, code)
+);
+CREATE TABLE IF NOT EXISTS clients (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    age TEXT NOT NULL,
+    date_created TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clients_user ON clients (user_id, created_at);
+CREATE TABLE IF NOT EXISTS simulations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_simulations_client ON simulations (user_id, client_id, created_at);
+"""
+
+class Store:
+    """SQLite-backed store; safe to share between threads and gunicorn workers"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Users and credits
+
+    def get_user(self, user_id, initial_credits=0):
+        """Return a user's credit record, creating it with initial_credits if missing"""
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO users (user_id, credits) VALUES (?, ?)", (user_id, initial_credits))
+        row = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        user = {
+            'credits': row['credits'],
+            'subscription_status': row['subscription_status'],
+            'unlimited': bool(row['unlimited']),
+            'patreon_member': bool(row['patreon_member']),
+            'patreon_tier': row['patreon_tier']
+        }
+        used_codes = self.used_discount_codes(user_id)
+        if used_codes:
+            user['used_discount_codes'] = used_codes
+        return user
+
+    def user_exists(self, user_id):
+        row = self._connect().execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return row is not None
+
+    def add_credits(self, user_id, credits):
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+        conn.execute("UPDATE users SET credits = credits + ? WHERE user_id = ?", (credits, user_id))
+        return conn.execute("SELECT credits FROM users WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def set_subscription(self, user_id, subscription_status, unlimited):
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+        conn.execute("UPDATE users SET subscription_status = ?, unlimited = ? WHERE user_id = ?",
+                     (subscription_status, int(unlimited), user_id))
+
+    def set_patreon_status(self, user_id, patreon_member, patreon_tier):
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+        conn.execute("UPDATE users SET patreon_member = ?, patreon_tier = ? WHERE user_id = ?",
+                     (int(bool(patreon_member)), patreon_tier, user_id))
+
+    def deduct_credit(self, user_id):
+        """Atomically take one credit; returns the remaining credits, or None if there were none"""
+        conn = self._connect()
+        cursor = conn.execute("UPDATE users SET credits = credits - 1 WHERE user_id = ? AND credits > 0",
+                              (user_id,))
+        if cursor.rowcount == 0:
+            return None
+        return conn.execute("SELECT credits FROM users WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def used_discount_codes(self, user_id):
+        rows = self._connect().execute(
+            "SELECT code FROM discount_redemptions WHERE user_id = ? ORDER BY redeemed_at", (user_id,))
+        return [row['code'] for row in rows]
+
+    def record_discount_redemption(self, user_id, code):
+        """Record that a user redeemed a code; returns False if they already had"""
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO discount_redemptions (user_id, code, redeemed_at) VALUES (?, ?, ?)",
+            (user_id, code, datetime.now().isoformat()))
+        return cursor.rowcount == 1
+
+    # Clients
+
+    def list_clients(self, user_id):
+        rows = self._connect().execute(
+            "SELECT * FROM clients WHERE user_id = ? ORDER BY created_at, seq", (user_id,))
+        return [self._client_dict(row) for row in rows]
+
+    def get_client(self, user_id, client_id):
+        row = self._connect().execute(
+            "SELECT * FROM clients WHERE id = ? AND user_id = ?", (client_id, user_id)).fetchone()
+        return self._client_dict(row) if row else None
+
+    def create_client(self, user_id, name, age, date_created):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # seq is AUTOINCREMENT, so IDs are never reused after a delete
+            cursor = conn.execute(
+                "INSERT INTO clients (id, user_id, name, age, date_created, created_at) VALUES ('', ?, ?, ?, ?, ?)",
+                (user_id, name, json.dumps(age), date_created, datetime.now().isoformat()))
+            client_id = f"client_{cursor.lastrowid}_{user_id}"
+            conn.execute("UPDATE clients SET id = ? WHERE seq = ?", (client_id, cursor.lastrowid))
+        return self.get_client(user_id, client_id)
+
+    def update_client(self, user_id, client_id, name, age, date_created):
+        cursor = self._connect().execute(
+            "UPDATE clients SET name = ?, age = ?, date_created = ? WHERE id = ? AND user_id = ?",
+            (name, json.dumps(age), date_created, client_id, user_id))
+        return self.get_client(user_id, client_id) if cursor.rowcount else None
+
+    def delete_client(self, user_id, client_id):
+        """Delete a client and its simulations; returns False if the client did not exist"""
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute("DELETE FROM clients WHERE id = ? AND user_id = ?", (client_id, user_id))
+            conn.execute("DELETE FROM simulations WHERE user_id = ? AND client_id = ?", (user_id, client_id))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _client_dict(row):
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'age': json.loads(row['age']),
+            'date_created': row['date_created'],
+            'user_id': row['user_id'],
+            'created_at': row['created_at']
+        }
+
+    # Simulations
+
+    def list_simulations(self, user_id, client_id):
+        rows = self._connect().execute(
+            "SELECT * FROM simulations WHERE user_id = ? AND client_id = ? ORDER BY created_at, seq",
+            (user_id, client_id))
+        return [self._simulation_dict(row) for row in rows]
+
+    def count_simulations(self, user_id, client_id):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM simulations WHERE user_id = ? AND client_id = ?",
+            (user_id, client_id)).fetchone()[0]
+
+    def get_simulation(self, user_id, simulation_id):
+        row = self._connect().execute(
+            "SELECT * FROM simulations WHERE id = ? AND user_id = ?", (simulation_id, user_id)).fetchone()
+        return self._simulation_dict(row) if row else None
+
+    def save_simulation(self, user_id, client_id, simulation_type, data):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "INSERT INTO simulations (id, user_id, client_id, type, data, created_at) VALUES ('', ?, ?, ?, ?, ?)",
+                (user_id, client_id, simulation_type, json.dumps(data), datetime.now().isoformat()))
+            simulation_id = f"sim_{cursor.lastrowid}_{user_id}"
+            conn.execute("UPDATE simulations SET id = ? WHERE seq = ?", (simulation_id, cursor.lastrowid))
+        return self.get_simulation(user_id, simulation_id)
+
+    def delete_simulation(self, user_id, simulation_id):
+        cursor = self._connect().execute(
+            "DELETE FROM simulations WHERE id = ? AND user_id = ?", (simulation_id, user_id))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _simulation_dict(row):
+        data = json.loads(row['data'])
+        return {
+            'id': row['id'],
+            'client_id': row['client_id'],
+            'user_id': row['user_id'],
+            'type': row['type'],
+            'data': data,
+            'created_at': row['created_at'],
+            'parameters': data.get('parameters', {}),
+            'results': data.get('results', {})
+        }
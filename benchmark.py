@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the simulation kernels, report generation, API endpoints and app boot
+
+Times each case over a grid of horizons and path counts, writes the results
+as JSON and, given a baseline file from an earlier run, flags every case
+that got slower by more than the threshold. Exits non-zero on a regression
+so it can gate a deploy.
+
+    python benchmark.py --output benchmark_results.json
+    python benchmark.py --baseline benchmark_baseline.json
+    python benchmark.py --quick --save-baseline benchmark_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+MC_PARAMS = {
+    'balance': 1000000, 'draw': 0.04, 'curr_exp': 50000, 'tax_rate': 0.22,
+    'apy_mean': 0.06, 'apy_sd': 0.1, 'inflation_mean': 0.025, 'inflation_sd': 0.01,
+    'annual_contrib': 20000, 'annual_contrib_years': 10, 'drawdown_start': 5,
+}
+SIM_PARAMS = {
+    'balance': 1000000, 'apy': 0.07, 'draw': 0.04, 'curr_exp': 50000, 'tax_rate': 0.22,
+    'inflation': 0.025, 'annual_contrib': 20000, 'annual_contrib_years': 10, 'drawdown_start': 5,
+}
+
+def time_case(func, repeat):
+    """Run func once to warm up, then repeat times; returns timing statistics in seconds"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'mean': statistics.fmean(timings),
+        'runs': repeat
+    }
+
+def kernel_cases(quick):
+    from simulator import simulation, monte_carlo_retirement, find_optimal_retirement_year
+
+    durations = (30, 60) if quick else (30, 60, 100)
+    path_counts = (1000, 10000) if quick else (1000, 10000, 50000)
+    cases = {}
+    for duration in durations:
+        cases[f'simulation/duration={duration}'] = lambda d=duration: simulation(duration=d, **SIM_PARAMS)
+        for paths in path_counts:
+            for annual in (False, True):
+                cases[f'monte_carlo_retirement/duration={duration}/paths={paths}/annual_returns={annual}'] = (
+                    lambda d=duration, n=paths, a=annual: monte_carlo_retirement(
+                        duration=d, simulations=n, annual_returns=a, seed=1, **MC_PARAMS))
+        for sequential in (False, True):
+            cases[f'find_optimal_retirement_year/duration={duration}/paths=10000/sequential={sequential}'] = (
+                lambda d=duration, s=sequential: find_optimal_retirement_year(
+                    duration=d, simulations=10000, seed=1, sequential=s, **MC_PARAMS))
+    return cases
+
+def report_payload(duration):
+    """A client with one basic, one Monte Carlo and one sweep simulation, as saved by the frontend"""
+    from simulator import simulation, monte_carlo_retirement, sensitivity_grid
+
+    model = dict(MC_PARAMS, duration=duration)
+    sweep = sensitivity_grid(model, 'draw', [0.03, 0.035, 0.04, 0.045, 0.05],
+                             'curr_exp', [40000, 50000, 60000], simulations=2000, seed=1)
+    simulations = [
+        {'type': 'basic', 'created_at': '2025-01-15T10:00:00',
+         'data': {'parameters': dict(SIM_PARAMS, duration=duration),
+                  'results': simulation(duration=duration, **SIM_PARAMS).to_dict()}},
+        {'type': 'monte_carlo', 'created_at': '2025-01-15T10:05:00',
+         'data': {'parameters': model,
+                  'results': {'success_rates': monte_carlo_retirement(seed=1, **model).tolist()}}},
+        {'type': 'sweep', 'created_at': '2025-01-15T10:10:00',
+         'data': {'parameters': model,
+                  'results': {'metric': 'success_rate', 'values': sweep.tolist(),
+                              'x_axis': {'name': 'draw', 'values': [0.03, 0.035, 0.04, 0.045, 0.05]},
+                              'y_axis': {'name': 'curr_exp', 'values': [40000, 50000, 60000]}}}},
+    ]
+    client = {'id': 'client_1_bench', 'name': 'Jane Doe', 'age': 55, 'user_id': 'bench',
+              'date_created': '2025-01-15', 'created_at': '2025-01-15T09:00:00'}
+    return client, simulations
+
+def report_cases(quick):
+    from cache import ResultCache
+    from report_generator import RetirementReportGenerator
+
+    cases = {}
+    for duration in ((40,) if quick else (40, 100)):
+        client, simulations = report_payload(duration)
+        # Cold runs draw every chart; warm runs reuse the chart cache
+        cases[f'create_report/duration={duration}/charts=cold'] = (
+            lambda c=client, s=simulations: RetirementReportGenerator(charts=ResultCache()).create_report(c, s))
+        warm = RetirementReportGenerator(charts=ResultCache())
+        cases[f'create_report/duration={duration}/charts=warm'] = (
+            lambda g=warm, c=client, s=simulations: g.create_report(c, s))
+    return cases
+
+def endpoint_cases(quick):
+    # A throwaway database keeps the benchmark away from real data
+    os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='benchmark_'), 'bench.sqlite3')
+    import app as app_module
+    from columnar import COLUMNAR_MIMETYPE
+
+    client = app_module.app.test_client()
+    cache = app_module.result_cache
+
+    def post(path, body, headers=None):
+        # Clear the result cache so every call measures the computation
+        cache.clear()
+        response = client.post(path, json=body, headers=headers)
+        assert response.status_code == 200, (path, response.status_code)
+
+    profile = client.post('/api/clients', json={'user_id': 'bench', 'client_data': {'name': 'Jane Doe', 'age': 55}}).get_json()
+    _, simulations = report_payload(40)
+    for simulation in simulations:
+        client.post(f"/api/clients/{profile['id']}/simulations", json={
+            'user_id': 'bench', 'type': simulation['type'], 'simulation_data': simulation['data']})
+
+    cases = {}
+    for duration in ((30,) if quick else (30, 100)):
+        cases[f'POST /api/simulate/duration={duration}'] = (
+            lambda d=duration: post('/api/simulate', dict(SIM_PARAMS, duration=d)))
+        cases[f'POST /api/monte-carlo/duration={duration}/paths=10000'] = (
+            lambda d=duration: post('/api/monte-carlo', dict(MC_PARAMS, duration=d, simulations=10000, seed=1)))
+    batch = {'base': dict(SIM_PARAMS, duration=40),
+             'grid': {'draw': list(np.linspace(0.02, 0.06, 10)), 'apy': list(np.linspace(0.04, 0.08, 10))}}
+    cases['POST /api/simulate/batch/scenarios=100'] = lambda: post('/api/simulate/batch', batch)
+    # The same responses in the columnar format, at full and float32 precision
+    for precision in ('float64', 'float32'):
+        accept = {'Accept': f'{COLUMNAR_MIMETYPE}; precision={precision}'}
+        cases[f'POST /api/simulate/duration=100/columnar={precision}'] = (
+            lambda h=accept: post('/api/simulate', dict(SIM_PARAMS, duration=100), h))
+        cases[f'POST /api/simulate/batch/scenarios=100/columnar={precision}'] = (
+            lambda h=accept: post('/api/simulate/batch', batch, h))
+    cases['POST /api/clients/<id>/report'] = lambda: post(
+        f"/api/clients/{profile['id']}/report", {'user_id': 'bench'})
+    return cases
+
+def boot_cases(quick):
+    # A fresh interpreter importing the app, as each gunicorn worker does at boot,
+    # with the report stack loaded on first use and preloaded
+    database = os.path.join(tempfile.mkdtemp(prefix='benchmark_'), 'boot.sqlite3')
+    cases = {}
+    for mode, preload in (('lazy', 'false'), ('preload', 'true')):
+        env = dict(os.environ, DATABASE_PATH=database, PRELOAD_REPORTS=preload)
+        cases[f'boot/import app/reports={mode}'] = lambda env=env: subprocess.run(
+            [sys.executable, '-c', 'import app'], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+    return cases
+
+SUITES = {'kernels': kernel_cases, 'reports': report_cases, 'endpoints': endpoint_cases, 'boot': boot_cases}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmarks(suites, repeat, quick, pattern=None):
+    results = {}
+    for suite in suites:
+        for name, func in SUITES[suite](quick).items():
+            if pattern and pattern not in name:
+                continue
+            results[name] = time_case(func, repeat)
+            print(f"  {name:<80} {results[name]['median'] * 1000:10.2f} ms")
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+            'quick': quick
+        },
+        'results': results
+    }
+
+def compare(current, baseline, threshold):
+    """Compare median timings; returns the names of cases slower than baseline by more than threshold"""
+    regressions = []
+    print(f"\n{'case':<80} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, timing in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<80} {'-':>10} {timing['median'] * 1000:9.2f}ms {'new':>8}")
+            continue
+        change = timing['median'] / before['median'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  <-- regression'
+        print(f"{name:<80} {before['median'] * 1000:9.2f}ms {timing['median'] * 1000:9.2f}ms {change:+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                        help='suite to run (repeatable, default all)')
+    parser.add_argument('--filter', help='only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case (default 5)')
+    parser.add_argument('--quick', action='store_true', help='smaller grids, for a fast check')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    parser.add_argument('--baseline', help='baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown of the median counted as a regression (default 0.25)')
+    parser.add_argument('--save-baseline', help='also write the results to this baseline file')
+    args = parser.parse_args()
+
+    suites = args.suite or list(SUITES)
+    print(f"Running {', '.join(suites)} benchmarks ({args.repeat} runs per case)")
+    current = run_benchmarks(suites, args.repeat, args.quick, args.filter)
+
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+if __name__ == '__main__':
+    main()
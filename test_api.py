@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Tests for the Flask endpoints in backend/app.py, run through Flask's test client
+"""
+
+import os
+import sys
+
+import importlib.util
+import io
+import json
+import time
+import types
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import app as app_module
+from report_generator import shutdown_report_pool
+from storage import Store
+
+BASE = {'balance': 1000000, 'apy': 0.07, 'draw': 0.04, 'duration': 30,
+        'curr_exp': 50000, 'tax_rate': 0.22, 'inflation': 0.025}
+MC_BASE = {'balance': 1000000, 'draw': 0.04, 'duration': 30, 'curr_exp': 50000, 'tax_rate': 0.22,
+           'apy_mean': 0.06, 'apy_sd': 0.1, 'inflation_mean': 0.025, 'inflation_sd': 0.01}
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'store', Store(str(tmp_path / 'store.sqlite3')))
+    jobs = app_module.create_job_queue(str(tmp_path / 'store.sqlite3'), workers=1)
+    jobs.poll_interval = 0.05
+    monkeypatch.setattr(app_module, 'jobs', jobs)
+    app_module.result_cache.clear()
+    yield app_module.app.test_client()
+    jobs.stop()
+
+def wait_for_job(client, job, user_id='planner', timeout=30):
+    deadline = time.monotonic() + timeout
+    while job['status'] in ('queued', 'running') and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(f"/api/jobs/{job['id']}", query_string={'user_id': user_id}).get_json()
+    return job
+
+def test_batch_grid_matches_single_simulations(client):
+    """Every grid point of a batch equals the corresponding /api/simulate call"""
+    response = client.post('/api/simulate/batch', json={
+        'base': BASE,
+        'grid': {'draw': [0.03, 0.04, 0.05], 'duration': [20, 30]}
+    })
+    assert response.status_code == 200
+    batch = response.get_json()
+    assert len(batch['scenarios']) == 6
+
+    for i, scenario in enumerate(batch['scenarios']):
+        single = client.post('/api/simulate', json=scenario).get_json()
+        assert batch['results']['principal'][i] == [single[f'Year-{y + 1}']['principal'] for y in range(scenario['duration'])]
+        assert batch['results']['surplus'][i] == [single[f'Year-{y + 1}']['surplus'] for y in range(scenario['duration'])]
+
+def test_monte_carlo_batch_uses_one_credit(client):
+    """A seeded Monte Carlo batch matches single seeded runs and costs one credit"""
+    app_module.get_user_credits('planner')
+    response = client.post('/api/simulate/batch', json={
+        'user_id': 'planner',
+        'kind': 'monte_carlo',
+        'base': MC_BASE,
+        'scenarios': [{'draw': 0.03}, {'draw': 0.05}],
+        'simulations': 2000,
+        'seed': 9
+    })
+    assert response.status_code == 200
+    batch = response.get_json()
+
+    for scenario, rates in zip(batch['scenarios'], batch['success_rates']):
+        single = client.post('/api/monte-carlo', json=dict(scenario, simulations=2000, seed=9)).get_json()
+        assert rates == single['success_rates']
+    assert app_module.get_user_credits('planner')['credits'] == 4
+
+def test_batch_rejects_bad_requests(client):
+    """Unknown kinds and missing parameters are reported as 400s"""
+    assert client.post('/api/simulate/batch', json={'kind': 'nope', 'base': BASE}).status_code == 400
+    assert client.post('/api/simulate/batch', json={'base': {'balance': 1}}).status_code == 400
+
+def test_path_counts_outside_limits_are_rejected(client, monkeypatch):
+    """Every Monte Carlo endpoint answers 400 for fewer than 1 or more than MC_MAX_SIMULATIONS paths"""
+    monkeypatch.setattr(app_module, 'MC_MAX_SIMULATIONS', 5000)
+    sweep = {'base': MC_BASE, 'x_axis': {'name': 'draw', 'values': [0.04]},
+             'y_axis': {'name': 'curr_exp', 'values': [50000]}}
+    for simulations in (0, -5, 5001):
+        assert client.post('/api/monte-carlo', json=dict(MC_BASE, simulations=simulations)).status_code == 400
+        assert client.post('/api/simulate/batch', json={
+            'kind': 'monte_carlo', 'base': MC_BASE, 'simulations': simulations}).status_code == 400
+        assert client.post('/api/sweep', json=dict(sweep, base=dict(MC_BASE, simulations=simulations))).status_code == 400
+        assert client.post('/api/jobs', json=dict(MC_BASE, user_id='planner', simulations=simulations)).status_code == 400
+    assert client.post('/api/simulate/batch', json={
+        'kind': 'monte_carlo', 'base': MC_BASE, 'simulations': 5000}).status_code == 200
+
+def test_batch_total_paths_are_capped(client, monkeypatch):
+    """A Monte Carlo batch may run at most BATCH_MAX_TOTAL_PATHS scenario-paths for its one credit"""
+    monkeypatch.setattr(app_module, 'BATCH_MAX_TOTAL_PATHS', 6000)
+    app_module.get_user_credits('planner')
+    batch = {'user_id': 'planner', 'kind': 'monte_carlo', 'base': MC_BASE,
+             'scenarios': [{'draw': 0.03}, {'draw': 0.04}, {'draw': 0.05}]}
+    assert client.post('/api/simulate/batch', json=dict(batch, simulations=2001)).status_code == 400
+    assert app_module.get_user_credits('planner')['credits'] == 5
+    assert client.post('/api/simulate/batch', json=dict(batch, simulations=2000)).status_code == 200
+
+def test_sweep_returns_grid_and_renders_in_report(client):
+    """A saved sweep comes back as a grid and renders as a report section"""
+    response = client.post('/api/sweep', json={
+        'base': MC_BASE,
+        'x_axis': {'name': 'draw', 'values': [0.03, 0.04, 0.05]},
+        'y_axis': {'name': 'curr_exp', 'values': [40000, 60000]},
+        'simulations': 1000,
+        'seed': 4
+    })
+    assert response.status_code == 200
+    sweep = response.get_json()
+    assert len(sweep['values']) == 2 and len(sweep['values'][0]) == 3
+    # Lower spending can only help
+    assert all(low >= high for low, high in zip(*sweep['values']))
+
+    profile = client.post('/api/clients', json={'user_id': 'planner', 'client_data': {'name': 'Jo Doe', 'age': 50}}).get_json()
+    client.post(f"/api/clients/{profile['id']}/simulations", json={
+        'user_id': 'planner', 'type': 'sweep',
+        'simulation_data': {'parameters': sweep['parameters'], 'results': sweep}
+    })
+    report = client.post(f"/api/clients/{profile['id']}/report", json={'user_id': 'planner'})
+    assert report.status_code == 200
+    assert report.data.startswith(b'%PDF')
+
+def test_sweep_validates_year_and_total_paths(client, monkeypatch):
+    """year must fall within every cell's horizon, and grid cells x simulations is capped"""
+    sweep = {'base': dict(MC_BASE, simulations=1000, seed=4), 'x_axis': {'name': 'draw', 'values': [0.03, 0.04]},
+             'y_axis': {'name': 'duration', 'values': [20, 30]}}
+    for year in (0, -1, 21):
+        assert client.post('/api/sweep', json=dict(sweep, year=year)).status_code == 400
+    response = client.post('/api/sweep', json=dict(sweep, year=20))
+    assert response.status_code == 200
+    final = client.post('/api/sweep', json=sweep).get_json()
+    assert response.get_json()['values'][0] == final['values'][0]
+
+    monkeypatch.setattr(app_module, 'BATCH_MAX_TOTAL_PATHS', 3999)
+    assert client.post('/api/sweep', json=sweep).status_code == 400
+
+def test_sweep_rejects_unknown_axis(client):
+    """Axes must name Monte Carlo parameters"""
+    response = client.post('/api/sweep', json={
+        'base': MC_BASE,
+        'x_axis': {'name': 'colour', 'values': [1]},
+        'y_axis': {'name': 'draw', 'values': [0.04]}
+    })
+    assert response.status_code == 400
+
+def test_monte_carlo_job_matches_synchronous_run(client):
+    """A queued Monte Carlo job returns the same rates as /api/monte-carlo and streams its status"""
+    body = dict(MC_BASE, user_id='planner', simulations=25000, seed=12)
+    app_module.get_user_credits('planner')
+    submitted = client.post('/api/jobs', json=dict(body, kind='monte_carlo'))
+    assert submitted.status_code == 202
+
+    job = wait_for_job(client, submitted.get_json())
+    assert (job['status'], job['progress']) == ('succeeded', 1.0)
+    events = client.get(f"/api/jobs/{job['id']}/events", query_string={'user_id': 'planner'})
+    assert b'"status": "succeeded"' in events.data
+
+    result = client.get(f"/api/jobs/{job['id']}/result", query_string={'user_id': 'planner'}).get_json()
+    app_module.result_cache.clear()
+    direct = client.post('/api/monte-carlo', json=body).get_json()
+    assert result == direct
+    assert client.get(f"/api/jobs/{job['id']}", query_string={'user_id': 'someone_else'}).status_code == 404
+
+def test_job_event_stream_is_bounded_and_resumes(tmp_path, monkeypatch):
+    """A job's event stream closes after JOB_EVENTS_MAX_SECONDS and a reconnect skips the snapshot already seen"""
+    path = str(tmp_path / 'store.sqlite3')
+    monkeypatch.setattr(app_module, 'store', Store(path))
+    jobs = app_module.create_job_queue(path, workers=0)
+    monkeypatch.setattr(app_module, 'jobs', jobs)
+    monkeypatch.setattr(app_module, 'JOB_EVENTS_MAX_SECONDS', 0.2)
+    params = app_module.monte_carlo_params(dict(MC_BASE, simulations=1000, seed=3))
+    queued = jobs.submit('planner', 'monte_carlo', params)
+    client = app_module.app.test_client()
+    url = f"/api/jobs/{queued['id']}/events"
+
+    first = client.get(url, query_string={'user_id': 'planner'}).get_data(as_text=True)
+    assert first.startswith('retry: ')
+    status = [chunk for chunk in first.split('\n\n') if 'event: status' in chunk]
+    assert len(status) == 1 and '"status": "queued"' in status[0]
+    event_id = status[0].split('\n')[0].removeprefix('id: ')
+
+    resumed = client.get(url, query_string={'user_id': 'planner'}, headers={'Last-Event-ID': event_id})
+    assert 'event: status' not in resumed.get_data(as_text=True)
+
+    jobs.cancel('planner', queued['id'])
+    final = client.get(url, query_string={'user_id': 'planner'}, headers={'Last-Event-ID': event_id})
+    assert '"status": "cancelled"' in final.get_data(as_text=True)
+
+def test_gunicorn_workers_start_the_job_queue_at_boot(tmp_path, monkeypatch):
+    """post_worker_init starts the queue and splits the CPUs between the workers' process pools"""
+    path = str(tmp_path / 'store.sqlite3')
+    monkeypatch.setattr(app_module, 'store', Store(path))
+    params = app_module.monte_carlo_params(dict(MC_BASE, simulations=1000, seed=3))
+    queued = app_module.create_job_queue(path, workers=0).submit('planner', 'monte_carlo', params)
+
+    jobs = app_module.create_job_queue(path, workers=1)
+    jobs.poll_interval = 0.05
+    monkeypatch.setattr(app_module, 'jobs', jobs)
+    spec = importlib.util.spec_from_file_location(
+        'gunicorn_conf', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'gunicorn.conf.py'))
+    gunicorn_conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gunicorn_conf)
+    import report_generator
+    import simulator
+    monkeypatch.setattr(simulator, '_process_pool_size', simulator._process_pool_size)
+    monkeypatch.setattr(report_generator, 'REPORT_POOL_WORKERS', report_generator.REPORT_POOL_WORKERS)
+    monkeypatch.delenv('MC_POOL_WORKERS', raising=False)
+    monkeypatch.delenv('REPORT_POOL_WORKERS', raising=False)
+    gunicorn_conf.post_worker_init(types.SimpleNamespace(cfg=types.SimpleNamespace(workers=2)))
+    try:
+        deadline = time.monotonic() + 30
+        while jobs.get('planner', queued['id'])['status'] in ('queued', 'running') and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert jobs.get('planner', queued['id'])['status'] == 'succeeded'
+    finally:
+        jobs.stop()
+    # Each of the two workers gets half the CPUs for its process pools
+    share = max(1, (os.cpu_count() or 1) // 2)
+    assert simulator._process_pool_size == share
+    assert report_generator.REPORT_POOL_WORKERS == share
+
+def test_monte_carlo_job_credit_is_taken_at_submit_and_refunded(client, tmp_path, monkeypatch):
+    """Submitting takes the credit; cancelling, a lost worker or hitting the job limit gives it back"""
+    # No worker threads, so submitted jobs stay queued until the test moves them
+    jobs = app_module.create_job_queue(str(tmp_path / 'store.sqlite3'), workers=0, max_active_per_user=2)
+    monkeypatch.setattr(app_module, 'jobs', jobs)
+    app_module.store.get_user('payer', initial_credits=3)
+    body = dict(MC_BASE, user_id='payer', kind='monte_carlo', simulations=1000, seed=4)
+    credits = lambda: app_module.store.get_user('payer')['credits']
+
+    cancelled = client.post('/api/jobs', json=body).get_json()
+    lost = client.post('/api/jobs', json=body).get_json()
+    assert credits() == 1
+    assert client.post('/api/jobs', json=body).status_code == 429
+    assert credits() == 1
+
+    client.delete(f"/api/jobs/{cancelled['id']}", query_string={'user_id': 'payer'})
+    assert credits() == 2
+    jobs._connect().execute("UPDATE jobs SET status = 'running', owner = 'old-host:1', lease_expires = 0, "
+                            "attempts = 3 WHERE id = ?", (lost['id'],))
+    assert jobs.get('payer', lost['id'])['status'] == 'running'
+    jobs._recover_expired()
+    assert jobs.get('payer', lost['id'])['status'] == 'failed'
+    assert credits() == 3
+
+    # With every credit reserved by queued jobs, the next submit is refused
+    app_module.store.deduct_credit('payer')
+    app_module.store.deduct_credit('payer')
+    client.post('/api/jobs', json=body)
+    assert credits() == 0
+    assert client.post('/api/jobs', json=dict(body, seed=5)).status_code == 402
+
+def test_report_job_returns_pdf(client):
+    """A report job renders the same PDF as the synchronous endpoint"""
+    profile = client.post('/api/clients', json={'user_id': 'planner', 'client_data': {'name': 'Jo Doe', 'age': 50}}).get_json()
+    client.post(f"/api/clients/{profile['id']}/simulations", json={
+        'user_id': 'planner', 'type': 'basic',
+        'simulation_data': {'parameters': BASE, 'results': client.post('/api/simulate', json=BASE).get_json()}
+    })
+    submitted = client.post('/api/jobs', json={'user_id': 'planner', 'kind': 'report', 'client_id': profile['id']})
+    job = wait_for_job(client, submitted.get_json())
+    assert job['status'] == 'succeeded'
+
+    pdf = client.get(f"/api/jobs/{job['id']}/result", query_string={'user_id': 'planner'})
+    assert pdf.mimetype == 'application/pdf'
+    assert pdf.data == client.post(f"/api/clients/{profile['id']}/report", json={'user_id': 'planner'}).data
+
+def test_streamed_monte_carlo_converges_to_regular_result(client):
+    """The stream sends running estimates per batch and ends with the full-run result"""
+    body = dict(MC_BASE, simulations=5000, seed=21)
+    response = client.post('/api/monte-carlo', json=dict(body, stream=True, batch_paths=2000))
+    assert response.mimetype == 'text/event-stream'
+
+    events = [chunk.split('\n') for chunk in response.get_data(as_text=True).strip().split('\n\n')]
+    names = [lines[0].removeprefix('event: ') for lines in events]
+    payloads = [json.loads(lines[1].removeprefix('data: ')) for lines in events]
+    assert names == ['progress', 'progress', 'result']
+    assert [p['paths'] for p in payloads] == [2000, 4000, 5000]
+    assert all(len(p['standard_errors']) == body['duration'] for p in payloads)
+
+    app_module.result_cache.clear()
+    assert payloads[-1]['success_rates'] == client.post('/api/monte-carlo', json=body).get_json()['success_rates']
+
+def test_unseeded_monte_carlo_is_cached(client):
+    """A request without a seed gets a seed derived from its parameters, so a repeat is a cache hit"""
+    first = client.post('/api/monte-carlo', json=MC_BASE).get_json()
+    again = client.post('/api/monte-carlo', json=MC_BASE).get_json()
+    other = client.post('/api/monte-carlo', json=dict(MC_BASE, draw=0.045)).get_json()
+
+    assert again == first
+    assert other != first
+    stats = app_module.result_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+def test_adaptive_monte_carlo_reports_paths_used(client):
+    """Adaptive requests report the paths they used; oversized fixed requests are refused"""
+    body = dict(MC_BASE, adaptive=True, tolerance=0.01, seed=8)
+    result = client.post('/api/monte-carlo', json=body).get_json()
+    assert 2000 <= result['simulations_used'] < app_module.MC_MAX_SIMULATIONS
+    assert max(result['standard_errors']) < 0.01
+
+    streamed = client.post('/api/monte-carlo', json=dict(body, stream=True, seed=9)).get_data(as_text=True)
+    final = json.loads(streamed.strip().split('\n\n')[-1].split('\n')[1].removeprefix('data: '))
+    assert max(final['standard_errors']) < 0.01
+
+    too_many = dict(MC_BASE, simulations=app_module.MC_MAX_SIMULATIONS + 1)
+    assert client.post('/api/monte-carlo', json=too_many).status_code == 400
+
+def test_halton_sampling_reports_variance_reduction(client):
+    """Quasi-random sampling reports its precision; plain requests keep the original response"""
+    plain = client.post('/api/monte-carlo', json=dict(MC_BASE, seed=1)).get_json()
+    assert list(plain) == ['success_rates']
+
+    halton = client.post('/api/monte-carlo', json=dict(MC_BASE, seed=1, sampling='halton', simulations=10000)).get_json()
+    assert halton['simulations_used'] == 10000
+    assert halton['variance_reduction'] > 1
+    assert client.post('/api/monte-carlo', json=dict(MC_BASE, sampling='sobol')).status_code == 400
+
+def test_bulk_reports_stream_a_zip_and_a_combined_pdf(client):
+    """Bulk reports cover every client with simulations, as a ZIP or as one PDF"""
+    names = ['Jo Doe', 'Sam Roe', 'Al Poe']
+    profiles = [client.post('/api/clients', json={'user_id': 'planner', 'client_data': {'name': name, 'age': 50}}).get_json()
+                for name in names]
+    results = client.post('/api/simulate', json=BASE).get_json()
+    for profile in profiles[:2]:
+        client.post(f"/api/clients/{profile['id']}/simulations", json={
+            'user_id': 'planner', 'type': 'basic', 'simulation_data': {'parameters': BASE, 'results': results}
+        })
+    # One report is already cached from the single-client endpoint
+    client.post(f"/api/clients/{profiles[0]['id']}/report", json={'user_id': 'planner'})
+
+    try:
+        response = client.post('/api/reports/bulk', json={'user_id': 'planner'})
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        assert sorted(archive.namelist()) == sorted(f"{p['id']}_retirement_report_{p['name'].replace(' ', '_')}.pdf"
+                                                    for p in profiles[:2])
+        assert all(archive.read(name).startswith(b'%PDF') for name in archive.namelist())
+
+        combined = client.post('/api/reports/bulk', json={'user_id': 'planner', 'format': 'pdf'})
+        assert combined.mimetype == 'application/pdf'
+        assert combined.data.startswith(b'%PDF')
+
+        # A client whose saved results cannot be rendered gets an error entry; the rest still arrive
+        client.post(f"/api/clients/{profiles[2]['id']}/simulations", json={
+            'user_id': 'planner', 'type': 'basic',
+            'simulation_data': {'parameters': BASE, 'results': {'Year-1': {'principal': 'n/a'}}}
+        })
+        archive = zipfile.ZipFile(io.BytesIO(client.post('/api/reports/bulk', json={'user_id': 'planner'}).data))
+        assert archive.testzip() is None
+        assert f"{profiles[2]['id']}_report_error.txt" in archive.namelist()
+        assert b'could not be generated' in archive.read(f"{profiles[2]['id']}_report_error.txt")
+        assert sum(name.endswith('.pdf') for name in archive.namelist()) == 2
+    finally:
+        shutdown_report_pool()
+
+def test_metrics_report_request_phases(client, monkeypatch):
+    """/metrics exposes per-endpoint latency, phase timings, cache counters and queue depth"""
+    from metrics import Metrics
+    from report_generator import chart_cache
+
+    monkeypatch.setattr(app_module, 'metrics', Metrics())
+    chart_cache.clear()
+    app_module.get_user_credits('planner')
+    results = client.post('/api/simulate', json=dict(BASE, user_id='planner')).get_json()
+    profile = client.post('/api/clients', json={'user_id': 'planner', 'client_data': {'name': 'Jo Doe', 'age': 50}}).get_json()
+    client.post(f"/api/clients/{profile['id']}/simulations", json={
+        'user_id': 'planner', 'type': 'basic', 'simulation_data': {'parameters': BASE, 'results': results}})
+    assert client.post(f"/api/clients/{profile['id']}/report", json={'user_id': 'planner'}).status_code == 200
+
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="/api/simulate",method="POST"} 1' in text
+    for phase in ('credit_check', 'simulation', 'serialize'):
+        assert f'http_request_phase_seconds_count{{endpoint="/api/simulate",phase="{phase}"}} 1' in text
+    for phase in ('chart_render', 'pdf_build'):
+        assert f'http_request_phase_seconds_count{{endpoint="/api/clients/<client_id>/report",phase="{phase}"}} 1' in text
+    assert 'http_requests_total{endpoint="/api/simulate",method="POST",status="200"} 1' in text
+    assert 'cache_misses_total{cache="result"}' in text
+    assert 'job_queue_depth{status="queued"} 0' in text
+
+def test_admin_is_refused_without_a_real_token(client, monkeypatch):
+    """An empty ADMIN_TOKEN or the env.example placeholder never grants admin access"""
+    for token in ('', 'change_me'):
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', token)
+        assert client.get('/api/admin/profiles', headers={'X-Admin-Token': token}).status_code == 403
+
+def test_profiled_requests_store_retrievable_profiles(client, monkeypatch, tmp_path):
+    """An admin's X-Profile header stores a pstats or speedscope profile of that request"""
+    import pstats
+    from profiling import ProfileStore
+
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(app_module, 'profiles', ProfileStore(str(tmp_path / 'profiles')))
+    body = dict(MC_BASE, simulations=2000, seed=5)
+    assert client.post('/api/monte-carlo', json=body, headers={'X-Profile': 'cprofile'}).status_code == 403
+    assert client.post('/api/monte-carlo', json=body, headers={'X-Profile': 'perf', 'X-Admin-Token': 'secret'}).status_code == 400
+
+    plain = client.post('/api/monte-carlo', json=body)
+    assert 'X-Profile-Id' not in plain.headers
+    ids = {}
+    for mode in ('cprofile', 'sample'):
+        response = client.post('/api/monte-carlo', json=body, headers={'X-Profile': mode, 'X-Admin-Token': 'secret'})
+        assert response.get_json() == plain.get_json()
+        ids[mode] = response.headers['X-Profile-Id']
+
+    admin = {'X-Admin-Token': 'secret'}
+    assert client.get('/api/admin/profiles').status_code == 403
+    listed = client.get('/api/admin/profiles', headers=admin).get_json()
+    assert {record['id']: record['format'] for record in listed} == {ids['cprofile']: 'pstats', ids['sample']: 'speedscope'}
+    assert all(record['endpoint'] == '/api/monte-carlo' for record in listed)
+
+    stats_path = tmp_path / 'mc.prof'
+    stats_path.write_bytes(client.get(f"/api/admin/profiles/{ids['cprofile']}", headers=admin).data)
+    # Profiled requests skip the cache, so the kernel shows up in the profile
+    assert any(name == 'monte_carlo_retirement' for _, _, name in pstats.Stats(str(stats_path)).stats)
+    speedscope = client.get(f"/api/admin/profiles/{ids['sample']}", headers=admin).get_json()
+    assert speedscope['profiles'][0]['type'] == 'sampled'
+    assert client.get('/api/admin/profiles/..%2Fsecret', headers=admin).status_code == 404
+
+@pytest.mark.parametrize('preload', ['false', 'true'])
+def test_report_stack_loads_on_first_use_unless_preloaded(tmp_path, preload):
+    """Importing the app leaves matplotlib and reportlab unloaded unless PRELOAD_REPORTS is set"""
+    import subprocess
+
+    env = dict(os.environ, DATABASE_PATH=str(tmp_path / 'store.sqlite3'), PRELOAD_REPORTS=preload)
+    loaded = subprocess.run(
+        [sys.executable, '-c', "import sys, app; print(*(m in sys.modules for m in ('report_generator', 'matplotlib', 'reportlab')))"],
+        cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'),
+        env=env, capture_output=True, text=True, check=True).stdout.split()
+    assert loaded == [preload.title()] * 3
+
+def test_columnar_responses_are_negotiated_by_accept_header(client):
+    """The columnar format carries the legacy values one array per field; JSON stays the default"""
+    columnar = 'application/vnd.retirement-sim.columnar+json'
+    body = dict(BASE, duration=60)
+    legacy = client.post('/api/simulate', json=body)
+    assert legacy.mimetype == 'application/json' and 'Accept' in legacy.headers['Vary']
+    assert client.post('/api/simulate', json=body, headers={'Accept': f'{columnar};q=0.5, application/json'}).is_json
+
+    response = client.post('/api/simulate', json=body, headers={'Accept': columnar})
+    assert response.mimetype == columnar
+    columns = json.loads(response.data)
+    rows = legacy.get_json()
+    assert columns['years'] == 60
+    for key, values in columns.items():
+        if key != 'years':
+            assert values == [rows[f'Year-{year}'][key] for year in range(1, 61)]
+
+    compact = client.post('/api/simulate', json=body, headers={'Accept': f'{columnar}; precision=float32'})
+    assert len(compact.data) < len(response.data) < len(legacy.data)
+    assert json.loads(compact.data)['principal'] == pytest.approx(columns['principal'], rel=1e-6)
+    assert client.post('/api/simulate', json=body, headers={'Accept': f'{columnar}; precision=float16'}).status_code == 406
+
+    mc_body = dict(MC_BASE, simulations=2000, seed=3, sampling='antithetic')
+    mc = json.loads(client.post('/api/monte-carlo', json=mc_body, headers={'Accept': columnar}).data)
+    assert mc == client.post('/api/monte-carlo', json=mc_body).get_json()
+
+    batch_body = {'base': BASE, 'grid': {'draw': [0.03, 0.05], 'duration': [20, 30]}}
+    batch = json.loads(client.post('/api/simulate/batch', json=batch_body, headers={'Accept': columnar}).data)
+    assert batch == client.post('/api/simulate/batch', json=batch_body).get_json()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the simulation result cache in backend/cache.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+
+from cache import ResultCache, SQLiteCache, cache_key
+
+def test_cache_key_ignores_parameter_order():
+    """Equal parameter sets hash to the same key regardless of ordering"""
+    assert cache_key('simulate', {'a': 1.0, 'b': 2}) == cache_key('simulate', {'b': 2, 'a': 1.0})
+    assert cache_key('simulate', {'a': 1.0}) != cache_key('monte-carlo', {'a': 1.0})
+    assert cache_key('simulate', {'a': 1.0}) != cache_key('simulate', {'a': 1.5})
+
+def test_cache_evicts_least_recently_used_and_counts_hits():
+    """The cache stays within max_entries, evicting the least recently used entry"""
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (3, 1, 2)
+
+def test_cache_expires_entries_after_ttl():
+    """Entries older than the time to live are treated as misses"""
+    cache = ResultCache(max_entries=2, ttl=-1)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    """Two caches on the same file (as in two gunicorn workers) see each other's entries"""
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = SQLiteCache(path, max_entries=2, ttl=60)
+    worker_b = SQLiteCache(path, max_entries=2, ttl=60)
+
+    worker_a.set('rates', np.array([0.5, 0.75]))
+    np.testing.assert_array_equal(worker_b.get('rates'), [0.5, 0.75])
+    worker_b.set('pdf', b'%PDF-1.4')
+    worker_b.set('other', b'x')
+
+    assert worker_a.get('rates') is None
+    assert worker_a.get('pdf') == b'%PDF-1.4'
+    # Each process's counts reach the shared counters when it flushes them
+    worker_a.flush_stats()
+    stats = worker_b.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 2)
+
+def test_sqlite_cache_lookups_do_not_write(tmp_path):
+    """A hit inside the recency resolution and below the flush threshold leaves the file untouched"""
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SQLiteCache(path, ttl=60)
+    cache.set('rates', [0.5])
+    changes = cache._connect().total_changes
+    for _ in range(10):
+        assert cache.get('rates') == [0.5]
+    assert cache._connect().total_changes == changes
+    assert cache.stats()['hits'] == 10
+
+def test_sqlite_cache_drops_entries_from_another_version(tmp_path):
+    """Reopening under a new version empties the cache; an unreadable pickle is a miss"""
+    path = str(tmp_path / 'cache.sqlite3')
+    old = SQLiteCache(path, ttl=60, version='v1')
+    old.set('rates', [0.5])
+    assert SQLiteCache(path, ttl=60, version='v1').get('rates') == [0.5]
+
+    new = SQLiteCache(path, ttl=60, version='v2')
+    assert new.get('rates') is None
+
+    new._connect().execute("INSERT INTO cache_entries VALUES ('broken', ?, ?, ?)", (b'not a pickle', 1e12, 0))
+    assert new.get('broken') is None
+    assert new.stats()['size'] == 0
+
+def test_repeat_requests_are_served_from_cache():
+    """Identical simulate and seeded Monte Carlo requests only compute once"""
+    import app as app_module
+
+    app_module.result_cache.clear()
+    client = app_module.app.test_client()
+    body = {'balance': 1000000, 'apy': 0.07, 'draw': 0.04, 'duration': 30,
+            'curr_exp': 50000, 'tax_rate': 0.22, 'inflation': 0.025}
+    first = client.post('/api/simulate', json=body)
+    second = client.post('/api/simulate', json=dict(body, balance=1000000.0))
+    assert first.get_json() == second.get_json()
+
+    mc_body = {'balance': 1000000, 'draw': 0.04, 'duration': 30, 'curr_exp': 50000,
+               'tax_rate': 0.22, 'apy_mean': 0.06, 'apy_sd': 0.1, 'inflation_mean': 0.025,
+               'inflation_sd': 0.01, 'simulations': 2000, 'seed': 3}
+    first = client.post('/api/monte-carlo', json=mc_body)
+    second = client.post('/api/monte-carlo', json=mc_body)
+    assert first.get_json() == second.get_json()
+
+    stats = client.get('/api/cache/stats').get_json()
+    assert (stats['hits'], stats['misses']) == (2, 2)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar JSON encoder in backend/columnar.py
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+import pytest
+
+from columnar import encode_array, encode_columns, round_significant
+
+def test_float32_precision_keeps_seven_significant_digits():
+    """Rounded values print with at most 7 significant digits and stay within float32 error"""
+    values = np.random.default_rng(0).lognormal(mean=10, sigma=4, size=1000) * np.sign(np.arange(1000) - 500)
+    rounded = round_significant(values)
+
+    assert np.allclose(rounded, values, rtol=5e-7, atol=0)
+    assert np.allclose(rounded, values.astype(np.float32), rtol=1e-6, atol=0)
+    for value in rounded:
+        mantissa = repr(abs(value)).split('e')[0].replace('.', '').strip('0')
+        assert len(mantissa) <= 7, value
+    assert encode_array(np.array([1234567.891, 0.1234567891]), 'float32') == '[1234568.0,0.1234568]'
+
+def test_encoding_matches_json_and_writes_non_finite_values_as_null():
+    """Full precision decodes to the same values as json.dumps; NaN and infinity become null"""
+    values = np.random.default_rng(1).normal(size=(3, 4)) * 1e6
+    assert json.loads(encode_array(values)) == values.tolist()
+    assert encode_array(np.array([1.5, np.nan, -np.inf])) == '[1.5,null,null]'
+
+    body = json.loads(encode_columns({'years': 2, 'nested': {'a': [np.array([1.0]), np.array([2.0, 3.0])]},
+                                      'status': np.array(['Retire', 'Keep Working'], dtype=object)}))
+    assert body == {'years': 2, 'nested': {'a': [[1.0], [2.0, 3.0]]}, 'status': ['Retire', 'Keep Working']}
+    with pytest.raises(ValueError):
+        encode_columns({}, 'float16')
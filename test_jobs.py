@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the background job queue in backend/jobs.py
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from jobs import JobQueue, JobLimitError
+
+def wait_until_finished(queue, user_id, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    job = queue.get(user_id, job_id)
+    while job['status'] in ('queued', 'running') and time.monotonic() < deadline:
+        time.sleep(0.02)
+        job = queue.get(user_id, job_id)
+    return job
+
+def test_per_user_limit_and_cancelling_queued_jobs(tmp_path):
+    """Users cannot exceed their active job limit; cancelling a queued job frees a slot"""
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), workers=0, max_active_per_user=2)
+    queue.register('echo', lambda params, context: params)
+    first = queue.submit('user_a', 'echo', {'n': 1})
+    queue.submit('user_a', 'echo', {'n': 2})
+    queue.submit('user_b', 'echo', {'n': 3})
+
+    with pytest.raises(JobLimitError):
+        queue.submit('user_a', 'echo', {'n': 4})
+    assert queue.depth() == {'queued': 3, 'running': 0}
+
+    assert queue.cancel('user_a', first['id'])['status'] == 'cancelled'
+    assert queue.cancel('user_b', first['id']) is None
+    queue.submit('user_a', 'echo', {'n': 4})
+
+def test_jobs_run_report_progress_and_fail_cleanly(tmp_path):
+    """Workers store results, progress and errors, and queued jobs survive reopening the table"""
+    path = str(tmp_path / 'jobs.sqlite3')
+    submitter = JobQueue(path, workers=0)
+    submitter.register('square', None)
+    job = submitter.submit('user_a', 'square', {'x': 7})
+    bad = submitter.submit('user_a', 'square', {})
+
+    def square(params, context):
+        context.update(0.5)
+        return params['x'] ** 2
+
+    aborted = []
+    refunded = threading.Event()
+
+    def on_abort(user_id, params):
+        aborted.append((user_id, params))
+        refunded.set()
+
+    worker = JobQueue(path, workers=1, poll_interval=0.02)
+    worker.register('square', square, on_abort=on_abort)
+    worker.start()
+    try:
+        assert wait_until_finished(worker, 'user_a', job['id'])['status'] == 'succeeded'
+        assert worker.result('user_a', job['id']) == 49
+        failed = wait_until_finished(worker, 'user_a', bad['id'])
+        assert failed['status'] == 'failed' and 'x' in failed['error']
+        assert refunded.wait(10) and aborted == [('user_a', {})]
+    finally:
+        worker.stop()
+
+def test_running_job_stops_at_next_progress_update(tmp_path):
+    """Cancelling a running job stops it at its next progress update"""
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), workers=1, poll_interval=0.02)
+    started = threading.Event()
+
+    def spin(params, context):
+        started.set()
+        while True:
+            context.update(0.1)
+            time.sleep(0.01)
+
+    queue.register('spin', spin)
+    job = queue.submit('user_a', 'spin', {})
+    try:
+        assert started.wait(10)
+        queue.cancel('user_a', job['id'])
+        assert wait_until_finished(queue, 'user_a', job['id'])['status'] == 'cancelled'
+    finally:
+        queue.stop()
+
+def strand(queue, job_id, owner='old-host:4242', lease_expires=None, attempts=1):
+    """Mark a job as running on a worker that is gone, as a redeploy leaves it"""
+    queue._connect().execute(
+        "UPDATE jobs SET status = 'running', owner = ?, lease_expires = ?, attempts = ? WHERE id = ?",
+        (owner, time.time() - 1 if lease_expires is None else lease_expires, attempts, job_id))
+
+def test_expired_leases_are_recovered_from_any_host(tmp_path):
+    """Jobs whose lease ran out on another host are requeued and run, or failed after max_attempts"""
+    path = str(tmp_path / 'jobs.sqlite3')
+    submitter = JobQueue(path, workers=0, max_active_per_user=2)
+    submitter.register('echo', None)
+    stranded = submitter.submit('user_a', 'echo', {'n': 1})
+    exhausted = submitter.submit('user_a', 'echo', {'n': 2})
+    strand(submitter, stranded['id'])
+    strand(submitter, exhausted['id'], attempts=3)
+
+    # The user's slots free up as soon as the dead jobs are recognised
+    third = submitter.submit('user_a', 'echo', {'n': 3})
+    assert submitter.get('user_a', stranded['id'])['status'] == 'queued'
+    lost = submitter.get('user_a', exhausted['id'])
+    assert lost['status'] == 'failed' and 'Worker lost' in lost['error']
+
+    worker = JobQueue(path, workers=1, poll_interval=0.02, max_attempts=3)
+    worker.register('echo', lambda params, context: params)
+    worker.start()
+    try:
+        assert wait_until_finished(worker, 'user_a', stranded['id'])['status'] == 'succeeded'
+        assert worker.result('user_a', stranded['id']) == {'n': 1}
+        assert wait_until_finished(worker, 'user_a', third['id'])['status'] == 'succeeded'
+    finally:
+        worker.stop()
+
+def test_cancel_ends_jobs_whose_worker_is_gone(tmp_path):
+    """cancel() finishes a running job at once when its lease expired or its process exited"""
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), workers=0, max_active_per_user=3)
+    queue.register('echo', None)
+    elsewhere = queue.submit('user_a', 'echo', {})
+    exited = queue.submit('user_a', 'echo', {})
+    alive = queue.submit('user_a', 'echo', {})
+    strand(queue, elsewhere['id'])
+    # A process on this host that no longer exists, holding a lease that is still valid
+    strand(queue, exited['id'], owner=f"{socket.gethostname()}:{2 ** 22 + 1}", lease_expires=time.time() + 60)
+    strand(queue, alive['id'], owner='other-host:1', lease_expires=time.time() + 60)
+
+    assert queue.cancel('user_a', elsewhere['id'])['status'] == 'cancelled'
+    assert queue.cancel('user_a', exited['id'])['status'] == 'cancelled'
+    # A live worker stops the job itself at its next progress update
+    still_running = queue.cancel('user_a', alive['id'])
+    assert still_running['status'] == 'running' and still_running['cancel_requested']
+
+def test_finished_jobs_are_deleted_after_the_retention_period(tmp_path):
+    """The heartbeat deletes finished jobs older than retention and keeps recent and active ones"""
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), workers=1, poll_interval=0.02,
+                     lease_timeout=0.2, retention=3600)
+    queue.register('echo', lambda params, context: params)
+    old = queue.submit('user_a', 'echo', {'n': 1})
+    recent = queue.submit('user_a', 'echo', {'n': 2})
+    queue.start()
+    try:
+        assert wait_until_finished(queue, 'user_a', old['id'])['status'] == 'succeeded'
+        assert wait_until_finished(queue, 'user_a', recent['id'])['status'] == 'succeeded'
+        queue._connect().execute("UPDATE jobs SET finished_at = '2000-01-01T00:00:00' WHERE id = ?", (old['id'],))
+        queued = queue.submit('user_b', 'echo', {'n': 3})
+
+        deadline = time.monotonic() + 5
+        while queue.get('user_a', old['id']) is not None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert queue.get('user_a', old['id']) is None
+        assert queue.result('user_a', recent['id']) == {'n': 2}
+        assert queue.get('user_b', queued['id']) is not None
+    finally:
+        queue.stop()
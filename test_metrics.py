@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the request and phase metrics in backend/metrics.py
+"""
+
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from metrics import Histogram, Metrics
+
+def test_histogram_buckets_are_cumulative():
+    """Each bucket counts every observation at or below its bound"""
+    histogram = Histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(('/a',), value)
+
+    lines = histogram.lines()
+    assert 'latency_seconds_bucket{endpoint="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="/a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{endpoint="/a"} 3' in lines
+
+def test_phases_are_summed_per_request_and_ignored_outside_one():
+    """Repeated and nested phases add up to one observation per request"""
+    metrics = Metrics()
+    with metrics.phase('simulation'):
+        pass
+    assert metrics.phases.lines()[2:] == []
+
+    metrics.start_request('/api/simulate', 'POST')
+    timed = metrics.timed('credit_check')(lambda: None)
+    timed()
+    with metrics.phase('credit_check'):
+        timed()
+    metrics.set_status(402)
+    metrics.finish_request()
+
+    text = metrics.render()
+    assert 'http_request_phase_seconds_count{endpoint="/api/simulate",phase="credit_check"} 1' in text
+    assert 'http_requests_total{endpoint="/api/simulate",method="POST",status="402"} 1' in text
+    # A finished request no longer collects phases
+    metrics.finish_request()
+    assert 'http_request_duration_seconds_count{endpoint="/api/simulate",method="POST"} 1' in metrics.render()
+
+def record_requests(directory, count):
+    metrics = Metrics(directory)
+    for _ in range(count):
+        metrics.start_request('/api/simulate', 'POST')
+        metrics.set_status(200)
+        metrics.finish_request()
+    metrics.flush()
+
+def test_render_sums_every_process_in_the_metrics_directory(tmp_path):
+    """With a shared directory, any process's scrape includes the other processes' flushed totals"""
+    child = multiprocessing.get_context('fork').Process(target=record_requests, args=(str(tmp_path), 3))
+    child.start()
+    child.join()
+
+    metrics = Metrics(str(tmp_path))
+    metrics.start_request('/api/simulate', 'POST')
+    metrics.set_status(200)
+    metrics.finish_request()
+
+    text = metrics.render()
+    assert 'http_requests_total{endpoint="/api/simulate",method="POST",status="200"} 4' in text
+    assert 'http_request_duration_seconds_count{endpoint="/api/simulate",method="POST"} 4' in text
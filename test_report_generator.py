@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the PDF report generator in backend/report_generator.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import numpy as np
+
+from cache import ResultCache
+from report_generator import RetirementReportGenerator
+from simulator import simulation, monte_carlo_retirement
+
+PARAMS = {'balance': 1000000, 'apy': 0.07, 'draw': 0.04, 'duration': 40, 'curr_exp': 50000,
+          'tax_rate': 0.22, 'inflation': 0.025, 'annual_contrib': 0}
+MC_PARAMS = {'balance': 1000000, 'draw': 0.04, 'duration': 40, 'curr_exp': 50000, 'tax_rate': 0.22,
+             'apy_mean': 0.06, 'apy_sd': 0.1, 'inflation_mean': 0.025, 'inflation_sd': 0.01,
+             'annual_contrib': 0, 'annual_contrib_years': 0, 'drawdown_start': 0}
+
+def report_simulations(**overrides):
+    basic = simulation(**dict(PARAMS, **overrides))
+    rates = monte_carlo_retirement(seed=1, **MC_PARAMS)
+    return [
+        {'type': 'basic', 'data': {'parameters': PARAMS, 'results': basic.to_dict()}, 'created_at': '2025-01-15'},
+        {'type': 'monte_carlo', 'data': {'parameters': MC_PARAMS, 'results': {'success_rates': rates.tolist()}},
+         'created_at': '2025-01-15'},
+    ]
+
+def test_charts_are_cached_by_their_data():
+    """Re-rendering a report reuses its chart images; changed data draws new ones"""
+    charts = ResultCache(max_entries=16, ttl=60)
+    generator = RetirementReportGenerator(chart_dpi=72, charts=charts)
+    client = {'name': 'Jo Doe', 'age': 50}
+
+    first = generator.create_report(client, report_simulations()).getvalue()
+    assert first.startswith(b'%PDF')
+    assert (charts.stats()['misses'], charts.stats()['size']) == (3, 3)
+
+    generator.create_report(client, report_simulations())
+    assert charts.stats()['hits'] == 3
+
+    generator.create_report(client, report_simulations(apy=0.05))
+    assert charts.stats()['size'] == 5
+
+def test_concurrent_chart_rendering_matches_sequential():
+    """Charts drawn from a thread pool are byte-identical to charts drawn one at a time"""
+    client = {'name': 'Jo Doe', 'age': 50}
+    sequential = ResultCache(max_entries=16, ttl=60)
+    concurrent = ResultCache(max_entries=16, ttl=60)
+    RetirementReportGenerator(chart_dpi=72, charts=sequential, chart_workers=1).create_report(client, report_simulations())
+    RetirementReportGenerator(chart_dpi=72, charts=concurrent, chart_workers=4).create_report(client, report_simulations())
+
+    assert sequential._entries.keys() == concurrent._entries.keys()
+    for key, (_, png) in sequential._entries.items():
+        assert concurrent._entries[key][1] == png
+    assert concurrent.stats()['hits'] == 3
+
+def test_bucketed_table_summarizes_year_bands():
+    """Bands report the end-of-band principal, band totals and a combined status"""
+    result = simulation(**dict(PARAMS, duration=12))
+    generator = RetirementReportGenerator(table_mode='bucketed', table_bucket_years=5)
+    labels, columns, statuses = generator._bucketed_columns(result)
+
+    assert labels == ['Years 1-5', 'Years 6-10', 'Years 11-12']
+    assert columns[0][1] == generator.format_currency(result.principal[9])
+    assert columns[4][2] == generator.format_currency(np.sum(result.surplus[10:12]))
+    assert all(status in ('Retire', 'Keep Working') or status.startswith('Retire ') for status in statuses)
+
+def test_paged_and_bucketed_tables_bound_each_table():
+    """Long horizons render as several bounded tables instead of one table per horizon"""
+    simulations = report_simulations(duration=100)[:1]
+    client = {'name': 'Jo Doe', 'age': 50}
+    for mode, tables in (('full', 1), ('paged', 4), ('bucketed', 1)):
+        generator = RetirementReportGenerator(chart_dpi=72, chart_workers=1, table_mode=mode, table_page_rows=30)
+        story = generator.build_story(client, simulations)
+        detailed = [flowable for flowable in story if getattr(flowable, '_cellvalues', [[None]])[0] == generator.DETAILED_HEADER]
+        assert len(detailed) == tables
+        assert sum(len(table._cellvalues) - 1 for table in detailed) == (20 if mode == 'bucketed' else 100)
+        assert generator.create_report(client, simulations).getvalue().startswith(b'%PDF')
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Tests for the simulation kernels in backend/simulator.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import simulator
+from simulator import (
+    SimulationResult, simulation, simulate_paths, round_cents, monte_carlo_retirement, monte_carlo_adaptive,
+    find_optimal_retirement_year, standard_error, variance_reduction,
+    shutdown_process_pool,
+    _path_blocks, _success_counts, _surplus_nonnegative,
+)
+
+PARAMS = {
+    'balance': 1000000,
+    'draw': 0.04,
+    'duration': 40,
+    'curr_exp': 50000,
+    'tax_rate': 0.22,
+    'annual_contrib': 20000,
+    'annual_contrib_years': 10,
+    'drawdown_start': 5,
+}
+
+MC_PARAMS = dict(PARAMS, apy_mean=0.06, apy_sd=0.1, inflation_mean=0.025, inflation_sd=0.01)
+
+def test_simulate_paths_matches_scalar_simulation():
+    """Every path of the batched engine matches a scalar simulation() run"""
+    rng = np.random.default_rng(1234)
+    apys = rng.normal(0.06, 0.03, 500)
+    inflations = rng.normal(0.025, 0.01, 500)
+
+    paths = simulate_paths(apy=apys, inflation=inflations, **PARAMS)
+
+    for i, (apy, inflation) in enumerate(zip(apys, inflations)):
+        result = simulation(apy=apy, inflation=inflation, **PARAMS)
+        for attr, field in SimulationResult.FIELDS:
+            np.testing.assert_array_equal(paths[field][i], getattr(result, attr))
+        np.testing.assert_array_equal(paths['surplus'][i] >= 0, result.status == 'Retire')
+
+def scalar_simulation(balance, apy, draw, duration, curr_exp, tax_rate, inflation, annual_contrib,
+                      annual_contrib_years=0, drawdown_start=0):
+    """The original per-year simulation() loop, kept as the reference for the array engines"""
+    princ, salary, real_income, spend, surplus, status = [], [], [], [], [], []
+    for year in range(duration):
+        if year > 0:
+            curr_exp *= (1 + inflation)
+        spend.append(round(curr_exp, 2))
+        balance *= (1 + apy)
+        contrib = annual_contrib if year < annual_contrib_years else 0
+        balance += contrib
+        balance -= curr_exp
+        princ.append(round(balance, 2))
+    for year in range(duration):
+        inc = princ[year] * draw if year >= drawdown_start else 0
+        salary.append(round(inc, 2))
+    for inc in salary:
+        real_income.append(round(inc * (1 - tax_rate), 2))
+    for i in range(duration):
+        sur = real_income[i] - spend[i]
+        surplus.append(round(sur, 2))
+        status.append('Retire' if sur >= 0 else 'Keep Working')
+    return {
+        'principal': princ,
+        'income': salary,
+        'real_income cap': real_income,
+        'projected_spend': spend,
+        'surplus': surplus,
+        'status': status,
+    }
+
+def random_simulation_params(rng):
+    """Parameters as a user would enter them: cents and rounded rates"""
+    return {
+        'balance': round(rng.uniform(0, 5e6), 2),
+        'apy': round(rng.uniform(-0.1, 0.12), 4),
+        'draw': round(rng.uniform(0, 0.08), 3),
+        'duration': int(rng.integers(1, 61)),
+        'curr_exp': round(rng.uniform(1e4, 2e5), 2),
+        'tax_rate': round(rng.uniform(0, 0.4), 3),
+        'inflation': round(rng.uniform(0, 0.06), 4),
+        'annual_contrib': round(rng.uniform(0, 5e4), 2),
+        'annual_contrib_years': int(rng.integers(0, 30)),
+        'drawdown_start': int(rng.integers(0, 30)),
+    }
+
+def test_simulation_matches_original_loop_to_the_cent():
+    """simulation() returns exactly the original loop's values, status included"""
+    rng = np.random.default_rng(2024)
+    for _ in range(2000):
+        params = random_simulation_params(rng)
+        result = simulation(**params)
+        expected = scalar_simulation(**params)
+        for attr, field in SimulationResult.FIELDS:
+            np.testing.assert_array_equal(getattr(result, attr), expected[field], err_msg=f"{field} {params}")
+        assert result.status.tolist() == expected['status']
+
+def test_simulate_paths_matches_original_loop_to_the_cent():
+    """Each scenario of a batched simulate_paths() call equals the original loop exactly"""
+    rng = np.random.default_rng(99)
+    for duration in (1, 17, 45, 60):
+        scenarios = [dict(random_simulation_params(rng), duration=duration) for _ in range(400)]
+        columns = {key: np.array([scenario[key] for scenario in scenarios])
+                   for key in scenarios[0] if key != 'duration'}
+        paths = simulate_paths(duration=duration, **columns)
+        success = _surplus_nonnegative(duration=duration, **columns)
+        for i, params in enumerate(scenarios):
+            expected = scalar_simulation(**params)
+            for _, field in SimulationResult.FIELDS:
+                np.testing.assert_array_equal(paths[field][i], expected[field], err_msg=f"{field} {params}")
+            assert success[i].tolist() == [status == 'Retire' for status in expected['status']]
+
+def test_round_cents_matches_python_round():
+    """round_cents() agrees with round(x, 2), including values np.round gets wrong"""
+    rng = np.random.default_rng(7)
+    values = np.concatenate([
+        [2.675, 1.005, -2.675, 0.125, 0.0, -0.0, 1e9 + 0.005],
+        rng.uniform(-1e7, 1e7, 50000),
+        np.arange(-50000, 50000) / 1000 + 0.005,
+    ])
+    np.testing.assert_array_equal(round_cents(values), [round(value, 2) for value in values.tolist()])
+
+def test_simulation_result_round_trips_legacy_dict():
+    """to_dict() keeps the Year-N response shape and from_dict() reads it back"""
+    result = simulation(apy=0.06, inflation=0.025, **PARAMS)
+    legacy = result.to_dict()
+
+    assert list(legacy) == [f'Year-{i + 1}' for i in range(PARAMS['duration'])]
+    assert list(legacy['Year-1']) == ['principal', 'income', 'real_income cap',
+                                      'projected_spend', 'surplus', 'status']
+    assert legacy['Year-1']['status'] in ('Retire', 'Keep Working')
+
+    shuffled = dict(reversed(list(legacy.items())))
+    parsed = SimulationResult.from_dict(shuffled)
+    for attr, _ in SimulationResult.FIELDS:
+        np.testing.assert_array_equal(getattr(parsed, attr), getattr(result, attr))
+    assert parsed.to_dict() == legacy
+
+def test_simulate_paths_per_year_rates():
+    """A per-year rate matrix with repeated columns reproduces the constant-rate paths"""
+    rng = np.random.default_rng(99)
+    apys = rng.normal(0.06, 0.03, 200)
+    inflations = rng.normal(0.025, 0.01, 200)
+    years = PARAMS['duration']
+
+    constant = simulate_paths(apy=apys, inflation=inflations, **PARAMS)
+    per_year = simulate_paths(apy=np.repeat(apys[:, None], years, axis=1),
+                              inflation=np.repeat(inflations[:, None], years, axis=1), **PARAMS)
+
+    for field, values in constant.items():
+        np.testing.assert_array_equal(per_year[field], values)
+
+def test_monte_carlo_seed_is_reproducible():
+    """The same seed gives the same success rates, a different seed does not"""
+    first = monte_carlo_retirement(simulations=2500, seed=42, **MC_PARAMS)
+    again = monte_carlo_retirement(simulations=2500, seed=42, **MC_PARAMS)
+    other = monte_carlo_retirement(simulations=2500, seed=43, **MC_PARAMS)
+
+    np.testing.assert_array_equal(first, again)
+    assert not np.array_equal(first, other)
+
+def test_sharded_counts_match_single_run():
+    """Splitting the path blocks across shards gives bit-identical success rates"""
+    for annual_returns in (False, True):
+        single = monte_carlo_retirement(simulations=4500, seed=7, annual_returns=annual_returns, **MC_PARAMS)
+
+        blocks = _path_blocks(7, 4500)
+        counts = sum(_success_counts(blocks[start:start + 2], MC_PARAMS, annual_returns)
+                     for start in range(0, len(blocks), 2))
+
+        np.testing.assert_array_equal(counts / 4500, single)
+
+def test_chunked_counts_match_one_chunk(monkeypatch):
+    """Simulating the blocks a chunk at a time gives the same counts as holding every path at once"""
+    for sampling in ('random', 'halton'):
+        monkeypatch.setattr(simulator, 'CHUNK_PATHS', 2000)
+        chunked = monte_carlo_retirement(simulations=4500, seed=3, annual_returns=True, sampling=sampling,
+                                         return_standard_errors=True, **MC_PARAMS)
+        monkeypatch.setattr(simulator, 'CHUNK_PATHS', 5000)
+        whole = monte_carlo_retirement(simulations=4500, seed=3, annual_returns=True, sampling=sampling,
+                                       return_standard_errors=True, **MC_PARAMS)
+        monkeypatch.undo()
+
+        np.testing.assert_array_equal(chunked[0], whole[0])
+        np.testing.assert_array_equal(chunked[1], whole[1])
+
+def test_chunked_median_final_balances_match_one_chunk(monkeypatch):
+    """Median final balances built a block chunk at a time equal those from every path at once"""
+    scenarios = [dict(MC_PARAMS, balance=balance, duration=duration)
+                 for balance in (1000000, 2000000) for duration in (20, 40)]
+    monkeypatch.setattr(simulator, 'CHUNK_PATHS', 2000)
+    chunked = simulator._median_final_balances(scenarios, 4500, annual_returns=True, seed=4)
+    monkeypatch.setattr(simulator, 'CHUNK_PATHS', 5000)
+    whole = simulator._median_final_balances(scenarios, 4500, annual_returns=True, seed=4)
+
+    np.testing.assert_array_equal(chunked, whole)
+
+def test_process_pool_sharding_matches_single_process():
+    """A run sharded across the process pool equals the in-process run"""
+    single = monte_carlo_retirement(simulations=5000, seed=11, **MC_PARAMS)
+    try:
+        sharded = monte_carlo_retirement(simulations=5000, seed=11, workers=3, **MC_PARAMS)
+    finally:
+        shutdown_process_pool()
+
+    np.testing.assert_array_equal(sharded, single)
+
+def test_sequential_search_agrees_with_full_run():
+    """Early-exit search finds the same retirement year as the full Monte Carlo scan"""
+    for overrides in ({}, {'balance': 3000000, 'apy_sd': 0.02}, {'curr_exp': 20000, 'drawdown_start': 0}):
+        params = dict(MC_PARAMS, **overrides)
+        full_year, _ = find_optimal_retirement_year(simulations=20000, seed=5, **params)
+        sequential_year, rate = find_optimal_retirement_year(simulations=20000, seed=5, sequential=True, **params)
+
+        assert sequential_year == full_year
+        assert 0 <= rate <= 1
+
+def test_sequential_search_stops_early_at_the_default_path_count():
+    """At the default 1000 paths a clear-cut search stops after a few looks with the full-run answer"""
+    for overrides in ({'balance': 3000000, 'apy_sd': 0.02}, {'curr_exp': 20000, 'drawdown_start': 0}):
+        params = dict(MC_PARAMS, **overrides)
+        year, _, paths = simulator._sequential_optimal_year(params, 1000, 0.90, False, 5, 0.95)
+
+        assert paths < 1000
+        assert year == find_optimal_retirement_year(seed=5, **params)[0]
+
+def test_adaptive_run_stops_at_tolerance():
+    """Adaptive runs stop once every year is precise enough, matching a fixed run of that size"""
+    rates, paths, errors = monte_carlo_adaptive(tolerance=0.01, max_simulations=100000, seed=3, **MC_PARAMS)
+
+    assert 2000 <= paths < 100000
+    assert errors.max() < 0.01
+    np.testing.assert_array_equal(errors, standard_error(rates, paths))
+    np.testing.assert_array_equal(rates, monte_carlo_retirement(simulations=paths, seed=3, **MC_PARAMS))
+
+    capped_rates, capped_paths, _ = monte_carlo_adaptive(tolerance=1e-6, max_simulations=4500, seed=3, **MC_PARAMS)
+    assert capped_paths == 4500
+    np.testing.assert_array_equal(capped_rates, monte_carlo_retirement(simulations=4500, seed=3, **MC_PARAMS))
+
+def test_variance_reduced_sampling_is_unbiased_and_more_precise():
+    """Antithetic and Halton sampling agree with plain sampling and report smaller standard errors"""
+    reference = monte_carlo_retirement(simulations=200000, seed=1, **MC_PARAMS)
+    for sampling, min_reduction in (('antithetic', 1.5), ('halton', 5)):
+        rates, errors = monte_carlo_retirement(simulations=20000, seed=2, sampling=sampling,
+                                               return_standard_errors=True, **MC_PARAMS)
+        assert np.all(np.abs(rates - reference) <= 4 * errors + 0.003)
+        assert variance_reduction(rates, 20000, errors) > min_reduction
+
+        again = monte_carlo_retirement(simulations=20000, seed=2, sampling=sampling, **MC_PARAMS)
+        np.testing.assert_array_equal(again, rates)
+
+def test_replicate_standard_errors_are_stable_across_seeds():
+    """Even a default 1000-path run has enough replicates for a steady precision estimate"""
+    for sampling in ('antithetic', 'halton'):
+        for paths in (1000, 2000):
+            totals, reductions = [], []
+            for seed in range(12):
+                rates, errors = monte_carlo_retirement(simulations=paths, seed=seed, sampling=sampling,
+                                                       return_standard_errors=True, **MC_PARAMS)
+                totals.append(np.sqrt(np.sum(errors ** 2)))
+                reductions.append(variance_reduction(rates, paths, errors))
+            assert max(totals) / min(totals) < 2, (sampling, paths, totals)
+            assert min(reductions) > 1.5 and max(reductions) / min(reductions) < 3, (sampling, paths, reductions)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent client and simulation store in backend/storage.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from storage import Store
+
+def test_client_ids_are_not_reused_after_delete(tmp_path):
+    """Deleting a client never lets a new client take its ID"""
+    store = Store(str(tmp_path / 'store.sqlite3'))
+    first = store.create_client('user_a', 'John Doe', 45, '2025-01-15')
+    second = store.create_client('user_a', 'Jane Doe', 50, '2025-01-15')
+    store.delete_client('user_a', first['id'])
+    third = store.create_client('user_a', 'Jim Doe', 30, '2025-01-15')
+
+    assert len({first['id'], second['id'], third['id']}) == 3
+    assert [c['name'] for c in store.list_clients('user_a')] == ['Jane Doe', 'Jim Doe']
+    assert store.list_clients('user_b') == []
+
+def test_data_survives_reopening_the_store(tmp_path):
+    """Clients, simulations and credits persist across store instances"""
+    path = str(tmp_path / 'store.sqlite3')
+    store = Store(path)
+    client = store.create_client('user_a', 'John Doe', 45, '2025-01-15')
+    saved = store.save_simulation('user_a', client['id'], 'basic', {'parameters': {'draw': 0.04}, 'results': {}})
+    store.get_user('user_a', initial_credits=2)
+    store.deduct_credit('user_a')
+
+    reopened = Store(path)
+    assert reopened.get_client('user_a', client['id']) == client
+    assert reopened.list_simulations('user_a', client['id']) == [saved]
+    assert saved['parameters'] == {'draw': 0.04}
+    assert reopened.get_user('user_a')['credits'] == 1
+
+def test_credit_deduction_stops_at_zero(tmp_path):
+    """deduct_credit never takes a balance below zero"""
+    store = Store(str(tmp_path / 'store.sqlite3'))
+    store.get_user('user_a', initial_credits=1)
+
+    assert store.deduct_credit('user_a') == 0
+    assert store.deduct_credit('user_a') is None
+    assert store.get_user('user_a')['credits'] == 0
+
+def test_delete_client_removes_its_simulations(tmp_path):
+    """Deleting a client also deletes its saved simulations"""
+    store = Store(str(tmp_path / 'store.sqlite3'))
+    client = store.create_client('user_a', 'John Doe', 45, '2025-01-15')
+    other = store.create_client('user_a', 'Jane Doe', 50, '2025-01-15')
+    store.save_simulation('user_a', client['id'], 'basic', {})
+    kept = store.save_simulation('user_a', other['id'], 'basic', {})
+
+    assert store.delete_client('user_a', client['id'])
+    assert not store.delete_client('user_a', client['id'])
+    assert store.count_simulations('user_a', client['id']) == 0
+    assert store.list_simulations('user_a', other['id']) == [kept]